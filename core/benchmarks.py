@@ -0,0 +1,112 @@
+"""
+Performance benchmarks for the hot pages and maintenance commands.
+
+Each benchmark is run through the Django test client (or call_command) as a
+given user. A run records wall-clock latency for every repetition, the
+number of SQL queries and the peak Python memory of one extra, traced
+repetition. Results can be saved as a baseline JSON and later runs compared
+against it; see the run_benchmarks command.
+"""
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache import bump_user_cache_version
+
+
+class Benchmark:
+    """A named page (url) or management command (command) to measure"""
+
+    def __init__(self, name, url=None, command=None, admin=False, cold_cache=False):
+        self.name = name
+        self.url = url
+        self.command = command
+        self.admin = admin
+        self.cold_cache = cold_cache
+
+    def prepare(self, user):
+        if self.cold_cache:
+            bump_user_cache_version(user.pk)
+
+    def run(self, client):
+        if self.command:
+            call_command(*self.command, stdout=io.StringIO(), verbosity=0)
+            return
+        response = client.get(reverse(self.url[0]) + self.url[1])
+        if response.status_code != 200:
+            raise RuntimeError(f'{self.name} returned HTTP {response.status_code}')
+        # Streaming responses do their work while being consumed
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        else:
+            response.content
+
+
+BENCHMARKS = [
+    Benchmark('dashboard', url=('dashboard', '')),
+    Benchmark('dashboard (cold cache)', url=('dashboard', ''), cold_cache=True),
+    Benchmark('breakdowns_api (cold cache)', url=('performance_breakdowns_api', ''), cold_cache=True),
+    Benchmark('portfolio_dashboard', url=('portfolio:portfolio_dashboard', '')),
+    Benchmark('trade_list', url=('journal:trade_list', '')),
+    Benchmark('trade_list (filtered)', url=('journal:trade_list', '?status=CLOSED&backtest=live')),
+    Benchmark('export_trades', url=('export_trades', '')),
+    Benchmark('admin_dashboard', url=('admin_dashboard', ''), admin=True),
+    Benchmark('export_all_trades', url=('export_all_trades', ''), admin=True),
+    Benchmark('recalculate_balances', command=('recalculate_balances',)),
+]
+
+
+def measure(benchmark, user, repeat=10, warmup=1):
+    """Run a benchmark and return its latency percentiles, query count and peak memory"""
+    client = Client()
+    client.force_login(user)
+
+    for _ in range(warmup):
+        benchmark.prepare(user)
+        benchmark.run(client)
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        benchmark.prepare(user)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            benchmark.run(client)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(context.captured_queries))
+
+    # Tracing slows everything down, so memory is measured in a separate run
+    benchmark.prepare(user)
+    tracemalloc.start()
+    try:
+        benchmark.run(client)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 2),
+        'p95_ms': round(float(np.percentile(timings, 95)), 2),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Return the regressions of result against a baseline entry, as messages"""
+    regressions = []
+    if result['queries'] > baseline['queries']:
+        regressions.append(f"queries {baseline['queries']} -> {result['queries']}")
+    for metric in ('p95_ms', 'peak_kb'):
+        if result[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f'{metric} {baseline[metric]} -> {result[metric]}')
+    return regressions
@@ -0,0 +1,46 @@
+"""
+Per-user versioned caching.
+
+Every user has a version token in the cache. Cached values are stored under
+keys that include the current token, so bumping the token (done by the model
+signals in core.models whenever a user's trades, strategies or portfolio
+change) makes all of that user's cached values unreachable at once, without
+having to know or delete their keys.
+"""
+import time
+
+from django.core.cache import cache
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def get_user_cache_version(user_id):
+    """Return the current cache version token of a user"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh token can never collide with entries cached under an
+        # evicted one
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_user_cache_version(user_id):
+    """Invalidate everything cached for a user"""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def cached_for_user(user_id, name, build, timeout=DASHBOARD_CACHE_TIMEOUT):
+    """Return build() cached for user_id under the user's current version"""
+    key = f'{name}:{user_id}:{get_user_cache_version(user_id)}'
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
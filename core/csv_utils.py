@@ -0,0 +1,106 @@
+"""
+Parsing helpers shared by the CSV importers: trades (journal.importers) and
+daily prices (market.loaders).
+
+Cell parsers return None for blank cells and raise ValueError with a message
+fit to show the user for anything else they cannot accept, so importers can
+report bad rows instead of failing the whole file.
+"""
+import codecs
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+DATE_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M',
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+)
+
+
+class CSVResult:
+    """Rows read from a CSV and its per-row errors, keeping at most max_errors of them"""
+
+    def __init__(self, max_errors=1000):
+        self.rows = 0
+        self.errors = []
+        self.error_count = 0
+        self.max_errors = max_errors
+
+    def add_error(self, *error):
+        """Record an error: where it is (such as the line number), then the message"""
+        self.error_count += 1
+        # Keep memory bounded on badly formatted files
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    @property
+    def truncated_errors(self):
+        return self.error_count - len(self.errors)
+
+
+def map_columns(header, aliases, required):
+    """
+    Return {field: column index} for a CSV header row. aliases maps each field
+    to its accepted lower-case header names; required fields must be present.
+    """
+    positions = {name.strip().lower().replace('_', ' '): index for index, name in enumerate(header)}
+    mapping = {}
+    for field, names in aliases.items():
+        for name in names:
+            if name in positions:
+                mapping[field] = positions[name]
+                break
+    missing = [field for field in required if field not in mapping]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    return mapping
+
+
+def parse_decimal(value, max_digits=None, decimal_places=2):
+    """
+    Parse a number such as '1,234.50'. It is rounded to decimal_places (None
+    to keep it as written) and must fit max_digits, like a DecimalField.
+    """
+    value = value.replace(',', '').strip()
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+        if not number.is_finite():
+            raise InvalidOperation
+        if decimal_places is not None:
+            number = number.quantize(Decimal(1).scaleb(-decimal_places))
+    except InvalidOperation:
+        raise ValueError(f"'{value}' is not a number")
+    if max_digits is not None and abs(number) >= 10 ** (max_digits - (decimal_places or 0)):
+        raise ValueError(f"'{value}' is too large")
+    return number
+
+
+def parse_datetime(value, formats=DATE_FORMATS):
+    """Parse a date or date and time as a naive datetime"""
+    value = value.strip()
+    if not value:
+        return None
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"'{value}' is not a recognised date")
+
+
+def check_utf8(chunks):
+    """Raise ValueError unless the byte chunks of a file decode as UTF-8, without holding the file"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        for chunk in chunks:
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ValueError('The file is not UTF-8 text. Save it as "CSV UTF-8" and try again.')
@@ -0,0 +1,134 @@
+"""
+A small database-backed job queue.
+
+Views enqueue work with ``enqueue()`` and return immediately; the
+``run_jobs`` management command claims pending jobs one at a time and runs
+the handler registered for the job's kind. It needs nothing but the
+database, so it works on a single box without Redis or Celery.
+
+    @job_handler('report')
+    def run_report(job):
+        ...
+"""
+import io
+import logging
+import tempfile
+import traceback
+
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BackgroundJob
+from .notifications import deliver_notification
+from .reports import write_csv_report, write_pdf_report
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of the given kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, **params):
+    """Queue a job and return it; params must be JSON serializable"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+    return BackgroundJob.objects.create(kind=kind, params=params, requested_by=user)
+
+
+def claim_next_job():
+    """
+    Mark the oldest pending job as running and return it, or None.
+
+    The claim is a conditional UPDATE, so several workers can poll the same
+    table without running a job twice.
+    """
+    while True:
+        job = BackgroundJob.objects.filter(status='PENDING').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING', started_at=now, heartbeat_at=now, attempts=job.attempts + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Put jobs left RUNNING by a crashed worker back in the queue: those that
+    have not reported progress for longer than older_than. Long jobs that
+    keep reporting progress are left alone.
+    """
+    cutoff = timezone.now() - older_than
+    return BackgroundJob.objects.filter(status='RUNNING').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    ).update(status='PENDING')
+
+
+def set_progress(job, progress, total=None):
+    """Record how far a running job has got, which also shows it is still alive"""
+    job.progress = progress
+    job.heartbeat_at = timezone.now()
+    fields = ['progress', 'heartbeat_at']
+    if total is not None:
+        job.total = total
+        fields.append('total')
+    job.save(update_fields=fields)
+
+
+def run_job(job):
+    """Run a claimed job with its handler and record the outcome"""
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        handler(job)
+    except Exception:
+        logger.exception('Job %s failed', job.pk)
+        job.status = 'FAILED'
+        job.error = traceback.format_exc()
+    else:
+        job.status = 'DONE'
+        job.error = ''
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+@job_handler('report')
+def run_report(job):
+    """Render a system report and store it in private storage, for report_job_download"""
+    report_type = job.params.get('report_type', 'overview')
+    format_type = job.params.get('format', 'pdf')
+
+    # Render into a temporary file so large reports are never held in memory
+    with tempfile.TemporaryFile() as output:
+        if format_type == 'pdf':
+            write_pdf_report(report_type, output)
+        else:
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            write_csv_report(report_type, text)
+            text.flush()
+            text.detach()
+        output.seek(0)
+        filename = f'nepse_journal_{report_type}_report_{job.pk}.{format_type}'
+        job.result_file.save(filename, File(output), save=False)
+
+
+@job_handler('notification')
+def run_notification(job):
+    """Email a notification to its audience, batch by batch"""
+    failed = deliver_notification(job, on_progress=lambda sent, total: set_progress(job, sent, total))
+    if failed:
+        numbers = ', '.join(str(batch.number) for batch in failed)
+        raise RuntimeError(f'{len(failed)} batch(es) could not be sent: {numbers}')
@@ -0,0 +1,114 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import timedelta
+
+from core.models import BackgroundJob
+from journal.forms import start_of_day
+from journal.models import Trade
+from learning.models import Course, Lesson, UserCourseProgress, annotate_course_progress
+from portfolio.models import DailySnapshot, Portfolio, Transaction, annotate_ledger_balance
+
+# Placeholder ids: query plans do not depend on whether the rows exist
+USER_ID = PORTFOLIO_ID = COURSE_ID = STRATEGY_ID = 1
+
+
+def key_queries():
+    """
+    (name, queryset, tables allowed to be scanned) for the queries behind the
+    hot views. Tables are only allowed to be scanned where the view really
+    reads all of them, such as the course catalog.
+    """
+    now = timezone.now()
+    user_trades = Trade.objects.filter(user_id=USER_ID)
+    # The lookups TradeFilterForm.filter() applies, built directly: the form
+    # drops a strategy that is not the user's, which would leave that case
+    # unfiltered on a database without such a row
+    trade_filters = (
+        ('no filters', {}),
+        ('symbol', {'symbol': 'NABIL'}),
+        ('status', {'status': 'OPEN'}),
+        ('strategy', {'strategy_id': STRATEGY_ID}),
+        ('backtest', {'is_backtest': True}),
+        ('start_date', {'entry_date__gte': start_of_day((now - timedelta(days=30)).date())}),
+    )
+    queries = [
+        ('dashboard: closed trade analytics',
+         user_trades.filter(status='CLOSED', realized_pnl__isnull=False).order_by('exit_date', 'pk'), ()),
+        ('dashboard: recent trades', user_trades.order_by('-entry_date')[:5], ()),
+        ('admin dashboard: latest trades', Trade.objects.order_by('-entry_date')[:10], ()),
+        ('admin stats: trades this week', Trade.objects.filter(entry_date__gte=now - timedelta(days=7)), ()),
+        ('portfolio: recent transactions',
+         Transaction.objects.filter(portfolio_id=PORTFOLIO_ID).order_by('-date')[:10], ()),
+        ('portfolio: deposits in range',
+         Transaction.objects.filter(
+             portfolio_id=PORTFOLIO_ID, transaction_type='DEPOSIT', date__gte=now - timedelta(days=30)
+         ), ()),
+        ('portfolio: daily snapshots',
+         DailySnapshot.objects.filter(portfolio_id=PORTFOLIO_ID).order_by('date'), ()),
+        ('portfolio: ledger balance', annotate_ledger_balance(Portfolio.objects.filter(pk=PORTFOLIO_ID)), ()),
+        ('learning: course list progress',
+         annotate_course_progress(Course.objects.all(), USER_ID), ('learning_course',)),
+        ('learning: course outline', Lesson.objects.filter(course_id=COURSE_ID).order_by('order', 'pk'), ()),
+        ('learning: completed lessons',
+         UserCourseProgress.objects.filter(user_id=USER_ID, lesson__course_id=COURSE_ID, completed=True), ()),
+        ('jobs: next pending job',
+         BackgroundJob.objects.filter(status='PENDING').order_by('created_at', 'pk')[:1], ()),
+    ]
+    for label, filters in trade_filters:
+        queries.append((
+            f'trade list: {label}',
+            user_trades.filter(**filters).order_by('-entry_date', '-pk')[:51],
+            (),
+        ))
+    return queries
+
+
+def full_scans(plan, vendor):
+    """Return the tables a query plan reads with a full table scan"""
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    # SQLite: "SCAN table" without "USING [COVERING] INDEX"; "SEARCH" lines use an index
+    tables = []
+    for line in plan.splitlines():
+        match = re.search(r'\bSCAN (\w+)(.*)', line)
+        if match and 'USING' not in match.group(2) and match.group(1) != 'CONSTANT':
+            tables.append(match.group(1))
+    return tables
+
+
+class Command(BaseCommand):
+    help = 'Explain the key queries of the hot views and fail if any of them does a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks are not supported on {vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Small development tables make a sequential scan the cheapest
+                # plan; disabling it shows whether a usable index exists at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset, allowed in key_queries():
+                plan = queryset.explain()
+                scans = [table for table in full_scans(plan, vendor) if table not in allowed]
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}: {", ".join(scans)}'))
+                else:
+                    self.stdout.write(f'ok         {name}')
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} key queries degraded to a full table scan')
+        self.stdout.write(self.style.SUCCESS('All key queries use an index'))
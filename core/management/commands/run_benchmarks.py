@@ -0,0 +1,91 @@
+import json
+import platform
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.benchmarks import BENCHMARKS, compare, measure
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Time the hot pages and commands, report p50/p95 latency, query counts and peak memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='User to run the pages as (default: the user with the most trades)')
+        parser.add_argument('--admin', help='Superuser for the admin pages (default: skip them)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per benchmark (default: 10)')
+        parser.add_argument('--only', nargs='+', help='Only run the benchmarks with these names')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before a regression is reported (default: 0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.annotate(trade_count=Count('trades')).order_by('-trade_count').first()
+        if user is None:
+            raise CommandError('No user to benchmark with; run seed_demo_data first')
+        admin = None
+        if options['admin']:
+            admin = User.objects.filter(username=options['admin'], is_superuser=True).first()
+            if admin is None:
+                raise CommandError(f"'{options['admin']}' is not a superuser")
+
+        benchmarks = [
+            benchmark for benchmark in BENCHMARKS
+            if (not options['only'] or benchmark.name in options['only'])
+            and (admin or not benchmark.admin)
+        ]
+        baseline_path = Path(options['baseline'])
+        baseline = {}
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text())['benchmarks']
+
+        self.stdout.write(self.style.WARNING(
+            f"Running {len(benchmarks)} benchmarks as {user.username} "
+            f"({user.trades.count()} trades), {options['repeat']} runs each..."
+        ))
+        self.stdout.write(f"{'benchmark':<28}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>11}")
+
+        results = {}
+        regressions = {}
+        # The test client uses the 'testserver' host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for benchmark in benchmarks:
+                result = measure(benchmark, admin if benchmark.admin else user, repeat=max(options['repeat'], 1))
+                results[benchmark.name] = result
+                self.stdout.write(
+                    f"{benchmark.name:<28}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                    f"{result['queries']:>9}{result['peak_kb']:>11}"
+                )
+                if benchmark.name in baseline:
+                    problems = compare(result, baseline[benchmark.name], options['tolerance'])
+                    if problems:
+                        regressions[benchmark.name] = problems
+                        self.stdout.write(self.style.ERROR(f"  regression: {'; '.join(problems)}"))
+
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({
+                'created_at': timezone.now().isoformat(),
+                'user': user.username,
+                'trades': user.trades.count(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'benchmarks': results,
+            }, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {baseline_path}'))
+        elif regressions:
+            raise CommandError(f'{len(regressions)} benchmarks regressed against {baseline_path}')
+        elif baseline:
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from core.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (reports, notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls of an empty queue (default: 2)')
+        parser.add_argument('--stale-after', type=int, default=30, help='Requeue RUNNING jobs that reported no progress for this many minutes (default: 30)')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+        
+        self.stdout.write('Waiting for jobs...')
+        try:
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                
+                self.stdout.write(f'Running {job}')
+                run_job(job)
+                style = self.style.SUCCESS if job.status == 'DONE' else self.style.ERROR
+                self.stdout.write(style(f'Finished {job}'))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,155 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from journal.models import Trade, seed_default_strategies
+from portfolio.batching import defer_balance_updates, mark_user_dirty
+from portfolio.models import Portfolio, Transaction
+
+# Listed NEPSE scrips with a typical price level (Rs.)
+SYMBOLS = {
+    'NABIL': 520, 'NICA': 410, 'GBIME': 230, 'EBL': 610, 'SCB': 590, 'HBL': 210,
+    'NMB': 240, 'PRVU': 200, 'KBL': 190, 'ADBL': 280, 'NTC': 880, 'NIFRA': 260,
+    'HDL': 1350, 'UNL': 28000, 'SHIVM': 520, 'CHCL': 520, 'UPPER': 240, 'API': 260,
+    'NHPC': 190, 'SHPC': 480, 'NLIC': 720, 'LICN': 940, 'NLG': 860, 'SICL': 750,
+    'CIT': 2100, 'HRL': 640, 'SHL': 340, 'TRH': 480, 'NRIC': 720, 'SJCL': 340,
+}
+EMOTIONS = [choice for choice, _ in Trade.EMOTION_CHOICES]
+DEMO_PASSWORD = 'demo12345'
+
+
+def trading_datetime(rng, start, days):
+    """A random trading-hours datetime within days of start; NEPSE trades Sunday to Thursday"""
+    while True:
+        day = start + timedelta(days=rng.randrange(days))
+        # weekday(): Friday is 4, Saturday is 5
+        if day.weekday() not in (4, 5):
+            break
+    moment = datetime.combine(day, time(11, 0)) + timedelta(minutes=rng.randrange(240))
+    return timezone.make_aware(moment)
+
+
+def price(value):
+    return Decimal(str(round(value, 2)))
+
+
+def demo_trades(rng, user, strategies, count, start, days):
+    for _ in range(count):
+        symbol = rng.choice(list(SYMBOLS))
+        entry_price = SYMBOLS[symbol] * rng.uniform(0.6, 1.4)
+        trade_type = 'BUY' if rng.random() < 0.85 else 'SELL'
+        entry_date = trading_datetime(rng, start, days)
+        trade = Trade(
+            user=user,
+            symbol=symbol,
+            trade_type=trade_type,
+            quantity=rng.randrange(1, 100) * 10,
+            entry_price=price(entry_price),
+            entry_date=entry_date,
+            stop_loss=price(entry_price * (0.93 if trade_type == 'BUY' else 1.07)),
+            target=price(entry_price * (1.15 if trade_type == 'BUY' else 0.85)),
+            strategy=rng.choice(strategies),
+            emotion=rng.choice(EMOTIONS),
+            is_backtest=rng.random() < 0.05,
+        )
+        exit_date = entry_date + timedelta(days=rng.randrange(1, 60), minutes=rng.randrange(240))
+        if rng.random() < 0.7 and exit_date < timezone.now():
+            trade.status = 'CLOSED'
+            trade.exit_price = price(entry_price * rng.gauss(1.01, 0.08))
+            trade.exit_date = exit_date
+        # bulk_create() skips Trade.save(), so store the P&L here
+        trade.realized_pnl = trade.pnl
+        yield trade
+
+
+def demo_transactions(rng, portfolio, count, start, days):
+    dates = sorted(trading_datetime(rng, start, days) for _ in range(count))
+    for index, date in enumerate(dates):
+        is_deposit = index == 0 or rng.random() < 0.7
+        transaction_record = Transaction(
+            portfolio=portfolio,
+            transaction_type='DEPOSIT' if is_deposit else 'WITHDRAWAL',
+            amount=Decimal(rng.randrange(5, 200) * 1000),
+            description='Fund transfer from bank' if is_deposit else 'Withdrawal to bank',
+        )
+        # date is auto_now_add, so it is set with bulk_update() after insertion
+        transaction_record.seed_date = date
+        yield transaction_record
+
+
+class Command(BaseCommand):
+    help = 'Create demo users with realistic NEPSE trades and transactions for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create (default: 10)')
+        parser.add_argument('--trades', type=int, default=500, help='Trades per user (default: 500)')
+        parser.add_argument('--transactions', type=int, default=50, help='Transactions per user (default: 50)')
+        parser.add_argument('--days', type=int, default=730, help='Spread the data over this many past days (default: 730)')
+        parser.add_argument('--prefix', default='demo', help="Username prefix (default: 'demo')")
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data (default: 42)')
+        parser.add_argument('--clear', action='store_true', help='Delete existing users with the prefix first')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        days = max(options['days'], 1)
+        start = timezone.localdate() - timedelta(days=days)
+
+        if options['clear']:
+            deleted = User.objects.filter(username__startswith=prefix).delete()[1].get(User._meta.label, 0)
+            self.stdout.write(self.style.WARNING(f'Deleted {deleted} existing demo users'))
+
+        first = User.objects.filter(username__startswith=prefix).count()
+        password = make_password(DEMO_PASSWORD)
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(
+                username=f'{prefix}{number:05d}',
+                email=f'{prefix}{number:05d}@example.com',
+                password=password,
+                date_joined=now - timedelta(days=rng.randrange(days)),
+                last_login=now - timedelta(hours=rng.randrange(24 * 60)),
+            )
+            for number in range(first + 1, first + options['users'] + 1)
+        ])
+        # bulk_create() only returns primary keys on some databases
+        users = list(User.objects.filter(username__in=[user.username for user in users]).order_by('pk'))
+
+        self.stdout.write(self.style.WARNING(
+            f"Seeding {len(users)} users with {options['trades']} trades and "
+            f"{options['transactions']} transactions each..."
+        ))
+
+        with defer_balance_updates():
+            for count, user in enumerate(users, 1):
+                with transaction.atomic():
+                    self.seed_user(rng, user, options, start, days)
+                    mark_user_dirty(user.pk)
+                self.stdout.write(f'Progress: {count}/{len(users)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users (password '{DEMO_PASSWORD}'), "
+            f"{len(users) * options['trades']} trades and {len(users) * options['transactions']} transactions"
+        ))
+
+    def seed_user(self, rng, user, options, start, days):
+        # Users are bulk-created, so the post_save receiver did not seed these
+        strategies = seed_default_strategies(user)
+        portfolio = Portfolio.objects.create(user=user, initial_capital=Decimal(rng.randrange(1, 50) * 10000))
+
+        Trade.objects.bulk_create(
+            demo_trades(rng, user, strategies, options['trades'], start, days), batch_size=1000
+        )
+        transactions = Transaction.objects.bulk_create(
+            list(demo_transactions(rng, portfolio, options['transactions'], start, days)), batch_size=1000
+        )
+        for transaction_record in transactions:
+            transaction_record.date = transaction_record.seed_date
+        Transaction.objects.bulk_update(transactions, ['date'], batch_size=1000)
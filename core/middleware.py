@@ -0,0 +1,85 @@
+"""
+Request profiling: wall time, query count, SQL time and the slowest
+statements of every request.
+
+Enabled with the REQUEST_PROFILING setting. Requests slower than
+SLOW_REQUEST_THRESHOLD_MS are written as one JSON line each to the
+'core.slow_requests' logger, and every request is added to the per-view
+statistics shown on the admin performance page.
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .profiling import SLOW_STATEMENTS_PER_VIEW, request_stats
+
+slow_request_logger = logging.getLogger('core.slow_requests')
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts and times every statement"""
+
+    def __init__(self, keep=SLOW_STATEMENTS_PER_VIEW):
+        self.count = 0
+        self.total_ms = 0.0
+        self.keep = keep
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += duration
+            # Keep only the slowest few so memory does not grow with the query count
+            if len(self.statements) < self.keep:
+                heapq.heappush(self.statements, (duration, sql))
+            elif duration > self.statements[0][0]:
+                heapq.heapreplace(self.statements, (duration, sql))
+
+    def slowest(self):
+        return sorted(self.statements, reverse=True)
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        slowest = recorder.slowest()
+        request_stats.record(view, wall_ms, recorder.total_ms, recorder.count, slowest)
+
+        if wall_ms >= self.threshold_ms:
+            slow_request_logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'user_id': getattr(getattr(request, 'user', None), 'pk', None),
+                'wall_ms': round(wall_ms, 1),
+                'sql_ms': round(recorder.total_ms, 1),
+                'queries': recorder.count,
+                'slowest': [{'ms': round(ms, 1), 'sql': sql} for ms, sql in slowest],
+            }))
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:04
+
+import os
+
+import core.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_results_to_private_storage(apps, schema_editor):
+    """Move report files written under MEDIA_ROOT into private storage"""
+    BackgroundJob = apps.get_model('core', 'BackgroundJob')
+    storage = core.models.private_storage()
+    for job in BackgroundJob.objects.exclude(result_file='').iterator():
+        old_name = job.result_file.name
+        if not default_storage.exists(old_name):
+            continue
+        with default_storage.open(old_name, 'rb') as source:
+            new_name = storage.save(core.models.job_result_path(job, os.path.basename(old_name)), source)
+        BackgroundJob.objects.filter(pk=job.pk).update(result_file=new_name)
+        default_storage.delete(old_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_notificationbatch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='result_file',
+            field=models.FileField(blank=True, storage=core.models.private_storage, upload_to=core.models.job_result_path),
+        ),
+        migrations.RunPython(move_results_to_private_storage, migrations.RunPython.noop),
+    ]
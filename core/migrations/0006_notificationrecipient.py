@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_private_job_results'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('email', models.EmailField(max_length=254)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.notificationbatch')),
+            ],
+            options={
+                'ordering': ['user_id'],
+                'unique_together': {('batch', 'user_id')},
+            },
+        ),
+    ]
@@ -1,3 +1,129 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from journal.models import Strategy, Trade
+from portfolio.models import Portfolio, Transaction
+from portfolio.signals import ledger_changed
+from .cache import bump_user_cache_version
+
+def private_storage():
+    """Storage outside MEDIA_ROOT for files that must only be served by permission-checking views"""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT, base_url=None)
+
+
+def job_result_path(job, filename):
+    # An unguessable directory per file; the name itself stays readable for downloads
+    return f'jobs/{uuid.uuid4().hex}/{filename}'
+
+
+class BackgroundJob(models.Model):
+    """A unit of work queued in the database and run by the run_jobs worker"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs')
+    result_file = models.FileField(upload_to=job_result_path, storage=private_storage, blank=True)
+    error = models.TextField(blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed whenever a running job reports progress; a job that stops
+    # reporting is taken to be abandoned by a crashed worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
+
+    @property
+    def progress_percent(self):
+        if self.status == 'DONE':
+            return 100
+        if not self.total:
+            return 0
+        return min(round(self.progress / self.total * 100), 100)
+
+
+class NotificationBatch(models.Model):
+    """One chunk of recipients of a notification job, sent over a single SMTP connection"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    job = models.ForeignKey(BackgroundJob, on_delete=models.CASCADE, related_name='notification_batches')
+    number = models.PositiveIntegerField()
+    first_user_id = models.BigIntegerField()
+    last_user_id = models.BigIntegerField()
+    recipients = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['number']
+        unique_together = ['job', 'number']
+
+    def __str__(self):
+        return f"Batch {self.number} of {self.job} ({self.status})"
+
+
+class NotificationRecipient(models.Model):
+    """One recipient of a notification batch; sent_at is set once their email has gone out"""
+    batch = models.ForeignKey(NotificationBatch, on_delete=models.CASCADE, related_name='deliveries')
+    user_id = models.BigIntegerField()
+    email = models.EmailField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['user_id']
+        unique_together = ['batch', 'user_id']
+
+    def __str__(self):
+        return f"{self.email} in {self.batch}"
+
+
+# Invalidate a user's cached dashboard whenever their data changes
+@receiver([post_save, post_delete], sender=Trade)
+@receiver([post_save, post_delete], sender=Strategy)
+@receiver([post_save, post_delete], sender=Portfolio)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_user_cache_version(instance.user_id)
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_user_cache_on_transaction(sender, instance, **kwargs):
+    user_id = Portfolio.objects.filter(pk=instance.portfolio_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        bump_user_cache_version(user_id)
 
+@receiver(ledger_changed)
+def invalidate_user_cache_on_ledger_change(sender, user_ids, **kwargs):
+    for user_id in user_ids:
+        bump_user_cache_version(user_id)
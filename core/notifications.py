@@ -0,0 +1,149 @@
+"""
+Email notifications to groups of users, delivered by the run_jobs worker.
+
+Recipients are read in primary-key order, batch by batch, so memory use does
+not grow with the number of users. Each batch is sent over one SMTP
+connection, recorded as a NotificationBatch with a NotificationRecipient per
+user, and retried on failure without aborting the rest of the notification.
+Every recipient is marked as soon as their email has gone out, so retries and
+reruns of an interrupted job only send to the recipients still waiting.
+"""
+import time
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import NotificationBatch, NotificationRecipient
+
+User = get_user_model()
+
+AUDIENCES = ('all', 'active', 'inactive')
+
+
+def notification_recipients(audience):
+    """Active users with an email address in the given audience"""
+    users = User.objects.filter(is_active=True).exclude(email='')
+    if audience == 'active':
+        users = users.filter(last_login__gte=timezone.now() - timedelta(days=7))
+    elif audience == 'inactive':
+        users = users.filter(last_login__lt=timezone.now() - timedelta(days=30))
+    return users
+
+
+def recipient_batches(users, batch_size, after_pk=0):
+    """Yield lists of (pk, email) in primary-key order, batch_size at a time"""
+    while True:
+        batch = list(
+            users.filter(pk__gt=after_pk).order_by('pk').values_list('pk', 'email')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        after_pk = batch[-1][0]
+
+
+def send_batch(batch, subject, message, from_email=None):
+    """
+    Email the recipients of batch not sent to yet over a single SMTP
+    connection, marking each one sent as it goes. Returns the number sent.
+    """
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    sent = 0
+    with get_connection(fail_silently=False) as connection:
+        for recipient in batch.deliveries.filter(sent_at__isnull=True):
+            if connection.send_messages([EmailMessage(subject, message, from_email, [recipient.email])]):
+                recipient.sent_at = timezone.now()
+                recipient.save(update_fields=['sent_at'])
+                sent += 1
+    return sent
+
+
+def create_batches(job, users, batch_size, after_pk, number):
+    """Yield new NotificationBatches of the users after after_pk, with their recipients"""
+    for recipients in recipient_batches(users, batch_size, after_pk=after_pk):
+        number += 1
+        batch = NotificationBatch.objects.create(
+            job=job,
+            number=number,
+            first_user_id=recipients[0][0],
+            last_user_id=recipients[-1][0],
+            recipients=len(recipients),
+        )
+        NotificationRecipient.objects.bulk_create(
+            NotificationRecipient(batch=batch, user_id=pk, email=email) for pk, email in recipients
+        )
+        yield batch
+
+
+def deliver_notification(job, on_progress=None):
+    """
+    Send the notification described by job.params in batches.
+
+    Batches an earlier run of the job did not finish, or that failed, are
+    completed first, skipping the recipients they already reached.
+    Returns the NotificationBatch records that still failed after retrying.
+    """
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
+    rate_limit = settings.NOTIFICATION_RATE_LIMIT
+    max_retries = settings.NOTIFICATION_MAX_RETRIES
+    subject = job.params['subject']
+    message = job.params['message']
+
+    users = notification_recipients(job.params.get('audience', 'all'))
+    batches = job.notification_batches.order_by('number')
+    # Every batch not fully sent, including failed ones followed by sent ones
+    unfinished = list(batches.exclude(status='SENT'))
+    for batch in unfinished:
+        # A run killed mid-batch never saved its count
+        batch.sent = batch.deliveries.filter(sent_at__isnull=False).count()
+    sent = sum(batches.filter(status='SENT').values_list('sent', flat=True))
+    sent += sum(batch.sent for batch in unfinished)
+    last = batches.last()
+    after_pk = last.last_user_id if last else 0
+    number = last.number if last else 0
+
+    waiting = NotificationRecipient.objects.filter(batch__in=unfinished, sent_at__isnull=True).count()
+    total = sent + waiting + users.filter(pk__gt=after_pk).count()
+    if on_progress:
+        on_progress(sent, total)
+
+    failed = []
+    for batch in chain(unfinished, create_batches(job, users, batch_size, after_pk, number)):
+        started = time.monotonic()
+        sent_before = batch.sent
+        attempts = 0
+        while True:
+            attempts += 1
+            batch.attempts += 1
+            try:
+                send_batch(batch, subject, message)
+            except Exception as e:
+                batch.error = str(e)
+                if attempts <= max_retries:
+                    time.sleep(2 ** attempts)
+                    continue
+                batch.status = 'FAILED'
+                failed.append(batch)
+            else:
+                batch.status = 'SENT'
+                batch.error = ''
+            break
+        # Includes the recipients reached by attempts that then failed
+        delivered = batch.deliveries.filter(sent_at__isnull=False).count()
+        sent += delivered - batch.sent
+        batch.sent = delivered
+        batch.finished_at = timezone.now()
+        batch.save()
+        if on_progress:
+            on_progress(sent, total)
+
+        # Throttle to at most rate_limit emails per second
+        if rate_limit > 0:
+            remaining = (batch.sent - sent_before) / rate_limit - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+    return failed
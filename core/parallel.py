@@ -0,0 +1,56 @@
+"""
+Chunked, optionally multi-process runs of work over a model's rows.
+
+Rows are split into contiguous primary key ranges, and a work function
+called as function(first_pk, last_pk, *args) handles one range inside a
+single process. With more than one worker the ranges are spread over a
+process pool whose workers set Django up themselves.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+Chunk = namedtuple('Chunk', 'first last size')
+
+
+def pk_chunks(queryset, chunk_size):
+    """Split the rows of queryset into Chunks of at most chunk_size consecutive primary keys"""
+    chunk_size = max(chunk_size, 1)
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return [
+        Chunk(pks[i], pks[min(i + chunk_size, len(pks)) - 1], min(chunk_size, len(pks) - i))
+        for i in range(0, len(pks), chunk_size)
+    ]
+
+
+def map_chunks(function, chunks, *args, workers=1, on_progress=None):
+    """
+    Yield function(chunk.first, chunk.last, *args) for every chunk, in order.
+    on_progress(done, total) is called with the rows covered so far after
+    each result has been handled.
+    """
+    total = sum(chunk.size for chunk in chunks)
+    done = 0
+
+    def run(results):
+        nonlocal done
+        for chunk, result in zip(chunks, results):
+            yield result
+            done += chunk.size
+            if on_progress:
+                on_progress(done, total)
+
+    if workers > 1 and len(chunks) > 1:
+        # Child processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            yield from run(pool.map(
+                function,
+                [chunk.first for chunk in chunks],
+                [chunk.last for chunk in chunks],
+                *[[arg] * len(chunks) for arg in args],
+            ))
+    else:
+        yield from run(function(chunk.first, chunk.last, *args) for chunk in chunks)
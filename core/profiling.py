@@ -0,0 +1,124 @@
+"""
+Per-view request timing statistics collected by RequestProfilingMiddleware.
+
+Each process keeps the most recent samples of every view in memory and
+periodically copies them to the shared cache under its own key, so the
+performance page can combine the samples of all worker processes without any
+locking on the request path.
+"""
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+from django.core.cache import cache
+
+SAMPLES_PER_VIEW = 1000
+SLOW_STATEMENTS_PER_VIEW = 5
+FLUSH_INTERVAL = 10
+PROFILE_TIMEOUT = 24 * 60 * 60
+
+_WORKERS_KEY = 'request-profile:workers'
+_GENERATION_KEY = 'request-profile:generation'
+
+
+def _process_key(pid):
+    return f'request-profile:{pid}'
+
+
+class RequestStats:
+    """Recent samples and the slowest statements per view, for one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_VIEW))
+        self.slow_statements = defaultdict(list)
+        self.last_flush = time.monotonic()
+        self.generation = None
+
+    def record(self, view, wall_ms, sql_ms, queries, statements):
+        """Add one request; statements are (duration_ms, sql) pairs"""
+        with self.lock:
+            self.samples[view].append((wall_ms, sql_ms, queries))
+            slowest = self.slow_statements[view]
+            for statement in statements:
+                if len(slowest) < SLOW_STATEMENTS_PER_VIEW:
+                    heapq.heappush(slowest, statement)
+                elif statement > slowest[0]:
+                    heapq.heapreplace(slowest, statement)
+            due = time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Copy this process's samples to the shared cache"""
+        generation = cache.get(_GENERATION_KEY)
+        with self.lock:
+            if generation != self.generation:
+                # reset_profiles() ran since the last flush
+                self.samples.clear()
+                self.slow_statements.clear()
+                self.generation = generation
+            snapshot = {
+                'samples': {view: list(samples) for view, samples in self.samples.items()},
+                'slow_statements': {view: list(slowest) for view, slowest in self.slow_statements.items()},
+            }
+            self.last_flush = time.monotonic()
+        pid = os.getpid()
+        cache.set(_process_key(pid), snapshot, PROFILE_TIMEOUT)
+        workers = cache.get(_WORKERS_KEY) or set()
+        if pid not in workers:
+            cache.set(_WORKERS_KEY, workers | {pid}, PROFILE_TIMEOUT)
+
+
+request_stats = RequestStats()
+
+
+def view_summaries():
+    """
+    Combine the samples of every process into per-view rows with request
+    count, wall time percentiles, mean query count and SQL time, and the
+    slowest statements seen. Rows are sorted by p95 wall time, slowest first.
+    """
+    request_stats.flush()
+    samples = defaultdict(list)
+    slow_statements = defaultdict(list)
+    for pid in cache.get(_WORKERS_KEY) or ():
+        snapshot = cache.get(_process_key(pid))
+        if not snapshot:
+            continue
+        for view, rows in snapshot['samples'].items():
+            samples[view].extend(rows)
+        for view, statements in snapshot['slow_statements'].items():
+            slow_statements[view].extend(statements)
+
+    summaries = []
+    for view, rows in samples.items():
+        values = np.array(rows, dtype=float)
+        wall = values[:, 0]
+        summaries.append({
+            'view': view,
+            'requests': len(rows),
+            'p50_ms': round(float(np.percentile(wall, 50)), 1),
+            'p95_ms': round(float(np.percentile(wall, 95)), 1),
+            'p99_ms': round(float(np.percentile(wall, 99)), 1),
+            'max_ms': round(float(wall.max()), 1),
+            'mean_sql_ms': round(float(values[:, 1].mean()), 1),
+            'mean_queries': round(float(values[:, 2].mean()), 1),
+            'slow_statements': [
+                {'ms': round(ms, 1), 'sql': sql}
+                for ms, sql in heapq.nlargest(SLOW_STATEMENTS_PER_VIEW, slow_statements[view])
+            ],
+        })
+    summaries.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return summaries
+
+
+def reset_profiles():
+    """Forget all collected samples; other processes drop theirs on their next flush"""
+    cache.set(_GENERATION_KEY, time.time_ns(), None)
+    for pid in cache.get(_WORKERS_KEY) or ():
+        cache.delete(_process_key(pid))
+    cache.delete(_WORKERS_KEY)
@@ -0,0 +1,263 @@
+"""
+Rendering of the admin system reports.
+
+These functions write PDF or CSV reports to a file object. They run in the
+background job worker (see core.jobs) rather than inside a web request.
+"""
+import csv
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER
+
+from journal.models import Trade
+
+User = get_user_model()
+
+REPORT_TYPES = ('overview', 'users', 'trades')
+REPORT_FORMATS = ('pdf', 'csv')
+
+EXPORT_CHUNK_SIZE = 2000
+
+TRADE_EXPORT_COLUMNS = (
+    'entry_date', 'symbol', 'trade_type', 'quantity', 'entry_price', 'exit_price', 'realized_pnl', 'status'
+)
+
+
+def trade_rows(trades, with_user=False):
+    """Yield CSV rows for a trade queryset, fetching only the exported columns"""
+    columns = TRADE_EXPORT_COLUMNS
+    if with_user:
+        columns = ('user__username',) + columns
+    for row in trades.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        *fields, exit_price, pnl, status = row
+        yield [*fields, exit_price or '', pnl or '', status]
+
+
+def user_rows(users):
+    """Yield CSV rows for a user queryset annotated with trade_count"""
+    rows = users.values_list(
+        'username', 'email', 'date_joined', 'last_login', 'is_active', 'trade_count'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for username, email, date_joined, last_login, is_active, trade_count in rows:
+        yield [username, email, date_joined, last_login or '', is_active, trade_count]
+
+
+def write_pdf_report(report_type, output):
+    """Render a PDF system report into the binary file object output"""
+    doc = SimpleDocTemplate(output, pagesize=letter, rightMargin=72, leftMargin=72,
+                           topMargin=72, bottomMargin=18)
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Define styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#6366f1'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#1e293b'),
+        spaceAfter=12,
+        spaceBefore=12
+    )
+    
+    # Add title
+    title = Paragraph("NEPSE Trade Journal - System Report", title_style)
+    elements.append(title)
+    elements.append(Spacer(1, 12))
+    
+    # Add report metadata
+    report_date = timezone.now().strftime('%B %d, %Y at %H:%M')
+    metadata = Paragraph(f"Generated on: {report_date}", styles['Normal'])
+    elements.append(metadata)
+    elements.append(Spacer(1, 20))
+    
+    if report_type == 'overview':
+        # System Overview
+        elements.append(Paragraph("System Overview", heading_style))
+        elements.append(Spacer(1, 12))
+        
+        # Stats data
+        total_users = User.objects.count()
+        active_users = User.objects.filter(
+            last_login__gte=timezone.now() - timedelta(days=7)
+        ).count()
+        total_trades = Trade.objects.count()
+        trades_this_month = Trade.objects.filter(
+            entry_date__gte=timezone.now() - timedelta(days=30)
+        ).count()
+        
+        overview_data = [
+            ['Metric', 'Value'],
+            ['Total Users', str(total_users)],
+            ['Active Users (Last 7 Days)', str(active_users)],
+            ['Total Trades', str(total_trades)],
+            ['Trades This Month', str(trades_this_month)],
+            ['System Uptime', '99.9%'],
+        ]
+        
+        overview_table = Table(overview_data, colWidths=[3*inch, 2*inch])
+        overview_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ]))
+        elements.append(overview_table)
+        elements.append(Spacer(1, 20))
+        
+        # Top Traders
+        elements.append(Paragraph("Top Traders", heading_style))
+        elements.append(Spacer(1, 12))
+        
+        top_traders = User.objects.annotate(
+            trade_count=Count('trades')
+        ).filter(trade_count__gt=0).order_by('-trade_count')[:10]
+        
+        trader_data = [['Rank', 'Username', 'Email', 'Total Trades']]
+        for idx, trader in enumerate(top_traders, 1):
+            trader_data.append([
+                str(idx),
+                trader.username,
+                trader.email[:30] if trader.email else 'N/A',
+                str(trader.trade_count)
+            ])
+        
+        trader_table = Table(trader_data, colWidths=[0.5*inch, 1.5*inch, 2*inch, 1*inch])
+        trader_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ]))
+        elements.append(trader_table)
+        
+    elif report_type == 'users':
+        # Detailed User Report
+        elements.append(Paragraph("User Report", heading_style))
+        elements.append(Spacer(1, 12))
+        
+        users = User.objects.annotate(trade_count=Count('trades')).order_by('-date_joined')[:50]
+        
+        user_data = [['Username', 'Email', 'Joined', 'Trades', 'Status']]
+        for user in users:
+            user_data.append([
+                user.username,
+                user.email[:25] if user.email else 'N/A',
+                user.date_joined.strftime('%Y-%m-%d'),
+                str(user.trade_count),
+                'Active' if user.is_active else 'Inactive'
+            ])
+        
+        user_table = Table(user_data, colWidths=[1.2*inch, 1.8*inch, 1*inch, 0.7*inch, 0.8*inch])
+        user_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ]))
+        elements.append(user_table)
+    
+    elif report_type == 'trades':
+        # Trading Activity Report
+        elements.append(Paragraph("Trading Activity Report", heading_style))
+        elements.append(Spacer(1, 12))
+        
+        trades = Trade.objects.select_related('user').order_by('-entry_date')[:50]
+        
+        trade_data = [['Date', 'User', 'Symbol', 'Type', 'Qty', 'Status']]
+        for trade in trades:
+            trade_data.append([
+                trade.entry_date.strftime('%Y-%m-%d'),
+                trade.user.username[:15],
+                trade.symbol,
+                trade.trade_type,
+                str(trade.quantity),
+                trade.status
+            ])
+        
+        trade_table = Table(trade_data, colWidths=[1*inch, 1.2*inch, 1*inch, 0.7*inch, 0.6*inch, 0.8*inch])
+        trade_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ]))
+        elements.append(trade_table)
+    
+    # Build PDF
+    doc.build(elements)
+
+
+def csv_report_rows(report_type):
+    """Yield the rows of a CSV system report"""
+    if report_type == 'overview':
+        yield ['System Overview Report']
+        yield ['Generated on:', timezone.now().strftime('%Y-%m-%d %H:%M:%S')]
+        yield []
+        yield ['Metric', 'Value']
+        yield ['Total Users', User.objects.count()]
+        yield ['Active Users (7 Days)', User.objects.filter(
+            last_login__gte=timezone.now() - timedelta(days=7)
+        ).count()]
+        yield ['Total Trades', Trade.objects.count()]
+        yield ['Trades This Month', Trade.objects.filter(
+            entry_date__gte=timezone.now() - timedelta(days=30)
+        ).count()]
+        
+    elif report_type == 'users':
+        yield ['Username', 'Email', 'Date Joined', 'Last Login', 'Is Active', 'Trade Count']
+        yield from user_rows(User.objects.annotate(trade_count=Count('trades')).order_by('-date_joined'))
+    
+    elif report_type == 'trades':
+        yield ['User', 'Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status']
+        yield from trade_rows(Trade.objects.order_by('-entry_date'), with_user=True)
+
+
+def write_csv_report(report_type, output):
+    """Write a CSV system report into the text file object output"""
+    writer = csv.writer(output)
+    for row in csv_report_rows(report_type):
+        writer.writerow(row)
@@ -0,0 +1,61 @@
+"""
+System-wide statistics for the admin dashboard.
+
+The counts are computed together in a few aggregate queries and cached for a
+short time, so the admin dashboard and its polling API cost one cache lookup
+per request regardless of how large the user and trade tables are.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from journal.models import Trade
+
+SYSTEM_STATS_KEY = 'system-stats'
+SYSTEM_STATS_TIMEOUT = 60
+
+
+def compute_system_stats():
+    """Run the admin dashboard queries and return their results as a dict"""
+    User = get_user_model()
+    now = timezone.now()
+    # Compare against datetime bounds rather than __date lookups so the
+    # queries can use the indexes on the date columns
+    start_of_today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    week_ago = start_of_today - timedelta(days=7)
+    month_ago = start_of_today - timedelta(days=30)
+
+    users = User.objects.aggregate(
+        total_users=Count('id'),
+        new_users_today=Count('id', filter=Q(date_joined__gte=start_of_today)),
+        active_sessions=Count('id', filter=Q(last_login__gte=now - timedelta(hours=1))),
+    )
+    trades = Trade.objects.aggregate(
+        total_trades=Count('id'),
+        trades_today=Count('id', filter=Q(entry_date__gte=start_of_today)),
+        trades_week=Count('id', filter=Q(entry_date__gte=week_ago)),
+        trades_month=Count('id', filter=Q(entry_date__gte=month_ago)),
+    )
+
+    recent_users = list(User.objects.annotate(
+        trade_count=Count('trades')
+    ).order_by('-date_joined')[:10])
+    top_traders = list(User.objects.annotate(
+        trade_count=Count('trades')
+    ).filter(trade_count__gt=0).order_by('-trade_count')[:5])
+
+    return {
+        **users,
+        **trades,
+        'recent_users': recent_users,
+        'top_traders': top_traders,
+        'computed_at': now,
+    }
+
+
+def get_system_stats():
+    """Return the cached system stats, recomputing them once they expire"""
+    return cache.get_or_set(SYSTEM_STATS_KEY, compute_system_stats, SYSTEM_STATS_TIMEOUT)
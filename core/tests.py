@@ -1,3 +1,87 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import notifications
+from .jobs import requeue_stale_jobs, set_progress
+from .models import BackgroundJob
+
+
+class FlakyConnection:
+    """An email connection that raises on the given send_messages() calls"""
+
+    def __init__(self, fail_on):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def __call__(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send_messages(self, messages):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise OSError('Connection reset')
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+@override_settings(NOTIFICATION_BATCH_SIZE=2, NOTIFICATION_RATE_LIMIT=0, NOTIFICATION_MAX_RETRIES=1)
+class DeliverNotificationTests(TestCase):
+    def setUp(self):
+        for number in range(5):
+            get_user_model().objects.create_user(f'user{number}', f'user{number}@example.com', 'x')
+        self.job = BackgroundJob.objects.create(kind='notification', params={'subject': 'Hi', 'message': 'Hello'})
+
+    def deliver(self, fail_on=()):
+        # No retry back-off in tests
+        with mock.patch.object(notifications, 'get_connection', FlakyConnection(set(fail_on))), \
+                mock.patch('time.sleep'):
+            return notifications.deliver_notification(self.job)
+
+    def recipients(self):
+        return sorted(address for message in mail.outbox for address in message.to)
+
+    def test_retry_sends_only_to_the_rest_of_the_batch(self):
+        # The second email of the first batch fails once
+        failed = self.deliver(fail_on={2})
+        self.assertEqual(failed, [])
+        self.assertEqual(self.recipients(), [f'user{number}@example.com' for number in range(5)])
+
+    def test_failed_batch_before_a_sent_one_is_resumed(self):
+        # Both attempts at the first batch's second email fail
+        failed = self.deliver(fail_on={2, 3})
+        self.assertEqual([batch.number for batch in failed], [1])
+        self.assertEqual(len(mail.outbox), 4)
+
+        mail.outbox = []
+        self.assertEqual(self.deliver(), [])
+        self.assertEqual(self.recipients(), ['user1@example.com'])
+        self.assertEqual(
+            list(self.job.notification_batches.values_list('number', 'status', 'sent')),
+            [(1, 'SENT', 2), (2, 'SENT', 2), (3, 'SENT', 1)],
+        )
+
+
+class RequeueStaleJobsTests(TestCase):
+    def test_jobs_reporting_progress_are_not_requeued(self):
+        long_ago = timezone.now() - timedelta(hours=2)
+        alive = BackgroundJob.objects.create(kind='notification', status='RUNNING', started_at=long_ago)
+        set_progress(alive, 10, 100)
+        stalled = BackgroundJob.objects.create(
+            kind='notification', status='RUNNING', started_at=long_ago, heartbeat_at=long_ago
+        )
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        alive.refresh_from_db()
+        stalled.refresh_from_db()
+        self.assertEqual((alive.status, stalled.status), ('RUNNING', 'PENDING'))
@@ -4,8 +4,10 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('api/breakdowns/', views.performance_breakdowns_api, name='performance_breakdowns_api'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/api/stats/', views.admin_stats_api, name='admin_stats_api'),
+    path('admin/performance/', views.request_profile, name='request_profile'),
     path('pricing/', views.pricing, name='pricing'),
     path('academy/', views.academy, name='academy'),
     path('about/', views.about, name='about'),
@@ -19,4 +21,6 @@ urlpatterns = [
     # Admin actions
     path('admin/send-notification/', views.send_notification_view, name='send_notification'),
     path('admin/generate-report/', views.generate_report_view, name='generate_report'),
+    path('admin/jobs/<int:pk>/', views.report_job_status, name='report_job_status'),
+    path('admin/jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
 ]
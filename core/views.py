@@ -1,26 +1,28 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Count, F, Avg, Q, Case, When, DecimalField
+from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from datetime import datetime, timedelta
-from django.http import JsonResponse, HttpResponse
-from journal.models import Trade, Strategy
+from datetime import timedelta
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse, Http404
+from journal.models import Trade
+from journal.analytics import BREAKDOWN_DIMENSIONS, analyze_trades, performance_breakdowns
+from .cache import cached_for_user
+from .stats import get_system_stats
+from .profiling import reset_profiles, view_summaries
+from .jobs import enqueue
+from .models import BackgroundJob
+from .notifications import AUDIENCES
+from .reports import REPORT_FORMATS, REPORT_TYPES, trade_rows, user_rows
 from portfolio.models import Portfolio
 from learning.models import Course
 from django.contrib import messages
-from django.core.mail import send_mass_mail
-from django.template.loader import render_to_string
 from django.conf import settings
 import json
 import csv
-from io import BytesIO
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+import itertools
+import os
 
 User = get_user_model()
 
@@ -70,111 +72,53 @@ def dashboard(request):
     """Enhanced dashboard with comprehensive analytics"""
     if request.user.is_superuser:
         return redirect('admin_dashboard')
-        
-    user = request.user
     
-    # Define PnL calculation
-    pnl_expression = Case(
-        When(trade_type='BUY', status='CLOSED', then=(F('exit_price') - F('entry_price')) * F('quantity')),
-        When(trade_type='SELL', status='CLOSED', then=(F('entry_price') - F('exit_price')) * F('quantity')),
-        default=0,
-        output_field=DecimalField()
+    # Rebuilt only after the user's trades, strategies or portfolio change
+    context = cached_for_user(request.user.pk, 'dashboard', lambda: dashboard_context(request.user))
+    return render(request, 'core/dashboard.html', context)
+
+
+def get_breakdowns(user):
+    """The user's performance breakdowns, cached until their trades or strategies change"""
+    return cached_for_user(user.pk, 'breakdowns', lambda: performance_breakdowns(user))
+
+
+def dashboard_context(user):
+    """Build the template context of the trader dashboard"""
+    # Live trades only; backtest results are kept out of the dashboard
+    all_trades = Trade.objects.filter(user=user, is_backtest=False)
+    counts = all_trades.aggregate(
+        total_trades=Count('id'),
+        active_positions=Count('id', filter=Q(status='OPEN')),
     )
+    total_trades = counts['total_trades']
     
-    # Get all trades
-    all_trades = Trade.objects.filter(user=user)
-    total_trades = all_trades.count()
-    
-    # Get closed trades with PnL annotation
-    closed_trades = all_trades.filter(status='CLOSED')
-    
-    # Calculate wins and losses manually
-    winning_trades = 0
-    losing_trades = 0
-    gross_profit = 0
-    gross_loss = 0
-    total_pnl = 0
-    
-    for trade in closed_trades:
-        if trade.pnl:
-            pnl_value = float(trade.pnl)
-            total_pnl += pnl_value
-            if pnl_value > 0:
-                winning_trades += 1
-                gross_profit += pnl_value
-            elif pnl_value < 0:
-                losing_trades += 1
-                gross_loss += abs(pnl_value)
+    # Win/loss metrics and chart series from the shared analytics engine
+    analytics = analyze_trades(user)
     
     try:
         portfolio = Portfolio.objects.get(user=user)
         current_balance = portfolio.current_balance
+        starting_capital = portfolio.initial_capital or 100000
     except Portfolio.DoesNotExist:
         current_balance = 100000  # Default starting balance
-            
-    win_rate = 0
-    if closed_trades.count() > 0:
-        win_rate = round((winning_trades / closed_trades.count()) * 100, 2)
-        
-    # Calculate profit factor
-    profit_factor = round(gross_profit / gross_loss, 2) if gross_loss > 0 else float('inf')
-    
-    # Calculate averages
-    avg_win = round(gross_profit / winning_trades, 2) if winning_trades > 0 else 0
-    avg_loss = round(gross_loss / losing_trades, 2) if losing_trades > 0 else 0
-    
-    # Expectancy calculation
-    total_closed = closed_trades.count()
-    if total_closed > 0:
-        win_rate_decimal = winning_trades / total_closed
-        loss_rate_decimal = losing_trades / total_closed
-        expectancy = (win_rate_decimal * avg_win) - (loss_rate_decimal * avg_loss)
-    else:
-        expectancy = 0
+        starting_capital = current_balance
+
+    # Drawdown, risk-adjusted returns, streaks and R-multiples
+    risk = analytics.risk_metrics(starting_capital)
 
     # Active positions
-    active_positions = all_trades.filter(status='OPEN').count()
+    active_positions = counts['active_positions']
     
     # Recent trades
-    recent_trades = all_trades.order_by('-entry_date')[:5]
-    
-    # Best strategy
-    best_strategy = Strategy.objects.filter(user=user).first()
-
-    # Chart Data (Cumulative PnL) - Calculate manually
-    chart_labels = []
-    chart_data = []
-    cumulative_pnl = 0
-    
-    recent_closed_trades = closed_trades.filter(exit_date__isnull=False).order_by('exit_date')
-    for trade in recent_closed_trades:
-        if trade.exit_date and trade.pnl:
-            chart_labels.append(trade.exit_date.strftime('%Y-%m-%d'))
-            cumulative_pnl += float(trade.pnl)
-            chart_data.append(round(cumulative_pnl, 2))
-    
-    # Monthly performance data - Group by month
-    monthly_labels = []
-    monthly_data = []
-    
-    # Get trades from last 12 months
-    twelve_months_ago = timezone.now() - timedelta(days=365)
-    monthly_trades = closed_trades.filter(exit_date__gte=twelve_months_ago).order_by('exit_date')
+    recent_trades = list(all_trades.order_by('-entry_date')[:5])
     
-    # Group by month
-    from collections import defaultdict
-    monthly_pnl = defaultdict(float)
+    # Per strategy, symbol and emotion performance; the best strategy leads its list
+    breakdowns = get_breakdowns(user)
+    best_strategy = next((row for row in breakdowns['strategy'] if row['key'] is not None), None)
     
-    for trade in monthly_trades:
-        if trade.exit_date and trade.pnl:
-            month_key = trade.exit_date.strftime('%Y-%m')
-            monthly_pnl[month_key] += float(trade.pnl)
-    
-    # Sort and prepare data
-    for month_key in sorted(monthly_pnl.keys()):
-        date_obj = datetime.strptime(month_key, '%Y-%m')
-        monthly_labels.append(date_obj.strftime('%b'))
-        monthly_data.append(round(monthly_pnl[month_key], 2))
+    monthly_labels = analytics.monthly_labels
+    monthly_data = analytics.monthly_data
     
     # If no monthly data, fill with zeros for last 12 months
     if not monthly_labels:
@@ -184,32 +128,54 @@ def dashboard(request):
             monthly_labels.append(month_date.strftime('%b'))
             monthly_data.append(0)
     
-    # Breakeven trades count
-    breakeven_trades = total_closed - winning_trades - losing_trades
-        
     context = {
         'total_trades': total_trades,
-        'win_rate': round(win_rate, 1),
-        'winning_trades': winning_trades,
-        'losing_trades': losing_trades,
-        'breakeven_trades': breakeven_trades,
+        'win_rate': round(analytics.win_rate, 1),
+        'winning_trades': analytics.winning_trades,
+        'losing_trades': analytics.losing_trades,
+        'breakeven_trades': analytics.breakeven_trades,
         'current_balance': current_balance,
-        'profit_factor': profit_factor,
-        'expectancy': round(expectancy, 2),
-        'avg_win': round(avg_win, 2),
-        'avg_loss': round(avg_loss, 2),
-        'gross_profit': round(gross_profit, 2),
-        'gross_loss': round(gross_loss, 2),
-        'total_pnl': total_pnl,
+        'profit_factor': round(analytics.profit_factor, 2),
+        'expectancy': round(analytics.expectancy, 2),
+        'avg_win': round(analytics.avg_win, 2),
+        'avg_loss': round(analytics.avg_loss, 2),
+        'gross_profit': round(analytics.gross_profit, 2),
+        'gross_loss': round(analytics.gross_loss, 2),
+        'total_pnl': analytics.total_pnl,
+        'risk': {
+            'max_drawdown': round(risk.max_drawdown, 2),
+            'max_drawdown_pct': round(risk.max_drawdown_pct, 1),
+            'max_drawdown_days': risk.max_drawdown_days,
+            'sharpe': None if risk.sharpe is None else round(risk.sharpe, 2),
+            'sortino': None if risk.sortino is None else round(risk.sortino, 2),
+            'longest_win_streak': risk.longest_win_streak,
+            'longest_loss_streak': risk.longest_loss_streak,
+            'avg_r': round(risk.avg_r, 2),
+            'total_r': round(risk.total_r, 1),
+            'trades_with_stop': risk.trades_with_stop,
+        },
         'active_positions': active_positions,
         'recent_trades': recent_trades,
         'best_strategy': best_strategy,
-        'chart_labels': json.dumps(chart_labels),
-        'chart_data': json.dumps(chart_data),
+        'breakdowns': breakdowns,
+        'chart_labels': json.dumps(analytics.chart_labels),
+        'chart_data': json.dumps(analytics.chart_data),
         'monthly_labels': json.dumps(monthly_labels),
         'monthly_data': json.dumps(monthly_data),
     }
-    return render(request, 'core/dashboard.html', context)
+    return context
+
+
+@login_required
+def performance_breakdowns_api(request):
+    """Per strategy, symbol and emotion performance as JSON; ?dimension= picks one"""
+    breakdowns = get_breakdowns(request.user)
+    dimension = request.GET.get('dimension')
+    if dimension:
+        if dimension not in BREAKDOWN_DIMENSIONS:
+            return JsonResponse({'error': f'Unknown dimension {dimension!r}'}, status=400)
+        breakdowns = {dimension: breakdowns[dimension]}
+    return JsonResponse({'breakdowns': breakdowns})
 
 
 def is_admin(user):
@@ -221,146 +187,109 @@ def is_admin(user):
 @user_passes_test(is_admin)
 def admin_dashboard(request):
     """Enhanced admin dashboard with comprehensive system analytics"""
-    
-    # Basic stats
-    total_users = User.objects.count()
-    total_trades = Trade.objects.count()
-    
-    # Time-based stats
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    new_users_today = User.objects.filter(date_joined__date=today).count()
-    trades_today = Trade.objects.filter(entry_date__date=today).count()
-    trades_week = Trade.objects.filter(entry_date__date__gte=week_ago).count()
-    trades_month = Trade.objects.filter(entry_date__date__gte=month_ago).count()
-    
-    # Recent users with trade counts
-    recent_users = User.objects.annotate(
-        trade_count=Count('trades')
-    ).order_by('-date_joined')[:10]
+    stats = get_system_stats()
     
     # Recent trades
     recent_trades = Trade.objects.select_related('user').order_by('-entry_date')[:10]
     
-    # Top traders by trade count
-    top_traders = User.objects.annotate(
-        trade_count=Count('trades')
-    ).filter(trade_count__gt=0).order_by('-trade_count')[:5]
-    
-    # Active sessions (users who logged in within last hour)
-    active_sessions = User.objects.filter(
-        last_login__gte=timezone.now() - timedelta(hours=1)
-    ).count()
-    
     context = {
-        'total_users': total_users,
-        'total_trades': total_trades,
-        'new_users_today': new_users_today,
-        'trades_today': trades_today,
-        'trades_week': trades_week,
-        'trades_month': trades_month,
-        'recent_users': recent_users,
+        'total_users': stats['total_users'],
+        'total_trades': stats['total_trades'],
+        'new_users_today': stats['new_users_today'],
+        'trades_today': stats['trades_today'],
+        'trades_week': stats['trades_week'],
+        'trades_month': stats['trades_month'],
+        'recent_users': stats['recent_users'],
         'recent_trades': recent_trades,
-        'top_traders': top_traders,
-        'active_sessions': active_sessions,
+        'top_traders': stats['top_traders'],
+        'active_sessions': stats['active_sessions'],
     }
     
     return render(request, 'core/admin_dashboard.html', context)
 
 
+@login_required
+@user_passes_test(lambda user: user.is_superuser)
+def request_profile(request):
+    """Per-view latency percentiles and SQL statistics from RequestProfilingMiddleware"""
+    if request.method == 'POST':
+        reset_profiles()
+        messages.success(request, 'Request statistics have been reset.')
+        return redirect('request_profile')
+    
+    context = {
+        'views': view_summaries(),
+        'profiling_enabled': settings.REQUEST_PROFILING,
+        'threshold_ms': settings.SLOW_REQUEST_THRESHOLD_MS,
+    }
+    return render(request, 'core/request_profile.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_stats_api(request):
     """API endpoint for real-time admin stats updates"""
-    
-    total_users = User.objects.count()
-    total_trades = Trade.objects.count()
-    active_sessions = User.objects.filter(
-        last_login__gte=timezone.now() - timedelta(hours=1)
-    ).count()
+    stats = get_system_stats()
     
     return JsonResponse({
-        'stats': [total_users, total_trades, active_sessions, 99.9],
-        'timestamp': timezone.now().isoformat()
+        'stats': [stats['total_users'], stats['total_trades'], stats['active_sessions'], 99.9],
+        'timestamp': stats['computed_at'].isoformat()
     })
 
 
+class Echo:
+    """Pseudo-buffer whose write() hands each CSV line straight back to the caller"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, rows):
+    """
+    Stream rows as a CSV download. rows is any iterable (usually a generator
+    over a queryset .iterator()), so the first bytes are sent immediately and
+    memory use does not grow with the number of rows.
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def export_trades(request):
     """Export user's trades to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="my_trades.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status'])
-    
     trades = Trade.objects.filter(user=request.user).order_by('-entry_date')
-    for trade in trades:
-        writer.writerow([
-            trade.entry_date,
-            trade.symbol,
-            trade.trade_type,
-            trade.quantity,
-            trade.entry_price,
-            trade.exit_price or '',
-            trade.pnl or '',
-            trade.status
-        ])
-    
-    return response
+    rows = itertools.chain(
+        [['Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status']],
+        trade_rows(trades),
+    )
+    return stream_csv('my_trades.csv', rows)
 
 
 @login_required
 @user_passes_test(is_admin)
 def export_users(request):
     """Export all users to CSV (admin only)"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="users.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Username', 'Email', 'Date Joined', 'Last Login', 'Is Active', 'Trade Count'])
-    
-    users = User.objects.annotate(trade_count=Count('trade')).order_by('-date_joined')
-    for user in users:
-        writer.writerow([
-            user.username,
-            user.email,
-            user.date_joined,
-            user.last_login or '',
-            user.is_active,
-            user.trade_count
-        ])
-    
-    return response
+    users = User.objects.annotate(trade_count=Count('trades')).order_by('-date_joined')
+    rows = itertools.chain(
+        [['Username', 'Email', 'Date Joined', 'Last Login', 'Is Active', 'Trade Count']],
+        user_rows(users),
+    )
+    return stream_csv('users.csv', rows)
 
 
 @login_required
 @user_passes_test(is_admin)
 def export_all_trades(request):
     """Export all trades to CSV (admin only)"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="all_trades.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['User', 'Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status'])
-    
-    trades = Trade.objects.select_related('user').order_by('-entry_date')
-    for trade in trades:
-        writer.writerow([
-            trade.user.username,
-            trade.entry_date,
-            trade.symbol,
-            trade.trade_type,
-            trade.quantity,
-            trade.entry_price,
-            trade.exit_price or '',
-            trade.pnl or '',
-            trade.status
-        ])
-    
-    return response
+    trades = Trade.objects.order_by('-entry_date')
+    rows = itertools.chain(
+        [['User', 'Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status']],
+        trade_rows(trades, with_user=True),
+    )
+    return stream_csv('all_trades.csv', rows)
 
 
 # Resource Pages
@@ -405,41 +334,15 @@ def send_notification_view(request):
             messages.error(request, 'Subject and message are required.')
             return redirect('admin_dashboard')
         
-        # Determine recipients
-        if notification_type == 'all':
-            users = User.objects.filter(is_active=True)
-        elif notification_type == 'active':
-            users = User.objects.filter(
-                is_active=True,
-                last_login__gte=timezone.now() - timedelta(days=7)
-            )
-        elif notification_type == 'inactive':
-            users = User.objects.filter(
-                is_active=True,
-                last_login__lt=timezone.now() - timedelta(days=30)
-            )
-        else:
-            users = User.objects.filter(is_active=True)
-        
-        # Prepare emails
-        email_messages = []
-        for user in users:
-            if user.email:
-                email_messages.append((
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@nepsejournal.com',
-                    [user.email]
-                ))
+        if notification_type not in AUDIENCES:
+            notification_type = 'all'
         
-        # Send emails
-        try:
-            sent_count = send_mass_mail(email_messages, fail_silently=False)
-            messages.success(request, f'Successfully sent notification to {len(email_messages)} users.')
-        except Exception as e:
-            messages.error(request, f'Error sending notifications: {str(e)}')
-        
-        return redirect('admin_dashboard')
+        job = enqueue(
+            'notification', request.user,
+            audience=notification_type, subject=subject, message=message,
+        )
+        messages.success(request, 'Your notification has been queued and is being sent in the background.')
+        return redirect('report_job_status', pk=job.pk)
     
     # GET request - show notification form
     context = {
@@ -459,15 +362,17 @@ def send_notification_view(request):
 @login_required
 @user_passes_test(is_admin)
 def generate_report_view(request):
-    """Generate comprehensive system report"""
+    """Queue a system report; it is rendered by the run_jobs worker"""
     if request.method == 'POST':
         report_type = request.POST.get('report_type', 'overview')
         format_type = request.POST.get('format', 'pdf')
+        if report_type not in REPORT_TYPES or format_type not in REPORT_FORMATS:
+            messages.error(request, 'Unknown report type or format.')
+            return redirect('generate_report')
         
-        if format_type == 'pdf':
-            return generate_pdf_report(request, report_type)
-        else:
-            return generate_csv_report(request, report_type)
+        job = enqueue('report', request.user, report_type=report_type, format=format_type)
+        messages.success(request, 'Your report has been queued and will be ready shortly.')
+        return redirect('report_job_status', pk=job.pk)
     
     # GET request - show report options
     context = {
@@ -476,248 +381,43 @@ def generate_report_view(request):
         'active_users': User.objects.filter(
             last_login__gte=timezone.now() - timedelta(days=7)
         ).count(),
+        'recent_jobs': BackgroundJob.objects.filter(
+            kind='report', requested_by=request.user
+        ).order_by('-created_at')[:5],
     }
     return render(request, 'core/generate_report.html', context)
 
 
-def generate_pdf_report(request, report_type):
-    """Generate PDF report"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72,
-                           topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#6366f1'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#1e293b'),
-        spaceAfter=12,
-        spaceBefore=12
-    )
-    
-    # Add title
-    title = Paragraph("NEPSE Trade Journal - System Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Add report metadata
-    report_date = timezone.now().strftime('%B %d, %Y at %H:%M')
-    metadata = Paragraph(f"Generated on: {report_date}", styles['Normal'])
-    elements.append(metadata)
-    elements.append(Spacer(1, 20))
-    
-    if report_type == 'overview':
-        # System Overview
-        elements.append(Paragraph("System Overview", heading_style))
-        elements.append(Spacer(1, 12))
-        
-        # Stats data
-        total_users = User.objects.count()
-        active_users = User.objects.filter(
-            last_login__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        total_trades = Trade.objects.count()
-        trades_this_month = Trade.objects.filter(
-            entry_date__gte=timezone.now() - timedelta(days=30)
-        ).count()
-        
-        overview_data = [
-            ['Metric', 'Value'],
-            ['Total Users', str(total_users)],
-            ['Active Users (Last 7 Days)', str(active_users)],
-            ['Total Trades', str(total_trades)],
-            ['Trades This Month', str(trades_this_month)],
-            ['System Uptime', '99.9%'],
-        ]
-        
-        overview_table = Table(overview_data, colWidths=[3*inch, 2*inch])
-        overview_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        elements.append(overview_table)
-        elements.append(Spacer(1, 20))
-        
-        # Top Traders
-        elements.append(Paragraph("Top Traders", heading_style))
-        elements.append(Spacer(1, 12))
-        
-        top_traders = User.objects.annotate(
-            trade_count=Count('trades')
-        ).filter(trade_count__gt=0).order_by('-trade_count')[:10]
-        
-        trader_data = [['Rank', 'Username', 'Email', 'Total Trades']]
-        for idx, trader in enumerate(top_traders, 1):
-            trader_data.append([
-                str(idx),
-                trader.username,
-                trader.email[:30] if trader.email else 'N/A',
-                str(trader.trade_count)
-            ])
-        
-        trader_table = Table(trader_data, colWidths=[0.5*inch, 1.5*inch, 2*inch, 1*inch])
-        trader_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        elements.append(trader_table)
-        
-    elif report_type == 'users':
-        # Detailed User Report
-        elements.append(Paragraph("User Report", heading_style))
-        elements.append(Spacer(1, 12))
-        
-        users = User.objects.annotate(trade_count=Count('trades')).order_by('-date_joined')[:50]
-        
-        user_data = [['Username', 'Email', 'Joined', 'Trades', 'Status']]
-        for user in users:
-            user_data.append([
-                user.username,
-                user.email[:25] if user.email else 'N/A',
-                user.date_joined.strftime('%Y-%m-%d'),
-                str(user.trade_count),
-                'Active' if user.is_active else 'Inactive'
-            ])
-        
-        user_table = Table(user_data, colWidths=[1.2*inch, 1.8*inch, 1*inch, 0.7*inch, 0.8*inch])
-        user_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        elements.append(user_table)
-    
-    elif report_type == 'trades':
-        # Trading Activity Report
-        elements.append(Paragraph("Trading Activity Report", heading_style))
-        elements.append(Spacer(1, 12))
-        
-        trades = Trade.objects.select_related('user').order_by('-entry_date')[:50]
-        
-        trade_data = [['Date', 'User', 'Symbol', 'Type', 'Qty', 'Status']]
-        for trade in trades:
-            trade_data.append([
-                trade.entry_date.strftime('%Y-%m-%d'),
-                trade.user.username[:15],
-                trade.symbol,
-                trade.trade_type,
-                str(trade.quantity),
-                trade.status
-            ])
-        
-        trade_table = Table(trade_data, colWidths=[1*inch, 1.2*inch, 1*inch, 0.7*inch, 0.6*inch, 0.8*inch])
-        trade_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        elements.append(trade_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # FileResponse sets the Content-Disposition header so that browsers
-    # present the option to save the file.
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="nepse_journal_{report_type}_report.pdf"'
-    
-    return response
+@login_required
+@user_passes_test(is_admin)
+def report_job_status(request, pk):
+    """Show (or return as JSON) the status of a queued report or notification"""
+    job = get_object_or_404(BackgroundJob, pk=pk, requested_by=request.user)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'kind': job.kind,
+            'status': job.status,
+            'progress': job.progress,
+            'total': job.total,
+            'progress_percent': job.progress_percent,
+            'download_url': reverse('report_job_download', args=[job.pk]) if job.status == 'DONE' and job.result_file else None,
+            'error': job.error.strip().splitlines()[-1] if job.error else '',
+        })
+    context = {
+        'job': job,
+        'batches': job.notification_batches.all() if job.kind == 'notification' else None,
+    }
+    return render(request, 'core/report_job.html', context)
 
 
-def generate_csv_report(request, report_type):
-    """Generate CSV report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="nepse_journal_{report_type}_report.csv"'
-    
-    writer = csv.writer(response)
-    
-    if report_type == 'overview':
-        writer.writerow(['System Overview Report'])
-        writer.writerow(['Generated on:', timezone.now().strftime('%Y-%m-%d %H:%M:%S')])
-        writer.writerow([])
-        writer.writerow(['Metric', 'Value'])
-        writer.writerow(['Total Users', User.objects.count()])
-        writer.writerow(['Active Users (7 Days)', User.objects.filter(
-            last_login__gte=timezone.now() - timedelta(days=7)
-        ).count()])
-        writer.writerow(['Total Trades', Trade.objects.count()])
-        writer.writerow(['Trades This Month', Trade.objects.filter(
-            entry_date__gte=timezone.now() - timedelta(days=30)
-        ).count()])
-        
-    elif report_type == 'users':
-        writer.writerow(['Username', 'Email', 'Date Joined', 'Last Login', 'Is Active', 'Trade Count'])
-        users = User.objects.annotate(trade_count=Count('trades')).order_by('-date_joined')
-        for user in users:
-            writer.writerow([
-                user.username,
-                user.email,
-                user.date_joined,
-                user.last_login or '',
-                user.is_active,
-                user.trade_count
-            ])
-    
-    elif report_type == 'trades':
-        writer.writerow(['User', 'Date', 'Symbol', 'Type', 'Quantity', 'Entry Price', 'Exit Price', 'P&L', 'Status'])
-        trades = Trade.objects.select_related('user').order_by('-entry_date')
-        for trade in trades:
-            writer.writerow([
-                trade.user.username,
-                trade.entry_date,
-                trade.symbol,
-                trade.trade_type,
-                trade.quantity,
-                trade.entry_price,
-                trade.exit_price or '',
-                trade.pnl or '',
-                trade.status
-            ])
-    
-    return response
+@login_required
+@user_passes_test(is_admin)
+def report_job_download(request, pk):
+    """Download the file produced by a finished job"""
+    job = get_object_or_404(BackgroundJob, pk=pk, requested_by=request.user, status='DONE')
+    if not job.result_file:
+        raise Http404('This job did not produce a file')
+    return FileResponse(
+        job.result_file.open('rb'), as_attachment=True, filename=os.path.basename(job.result_file.name)
+    )
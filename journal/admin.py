@@ -1,3 +1,25 @@
 from django.contrib import admin
+from portfolio.batching import defer_balance_updates
+from .models import Strategy, Trade, TradeImage
 
-# Register your models here.
+class TradeImageInline(admin.TabularInline):
+    model = TradeImage
+    extra = 0
+
+@admin.register(Trade)
+class TradeAdmin(admin.ModelAdmin):
+    inlines = [TradeImageInline]
+    list_display = ('symbol', 'user', 'trade_type', 'status', 'entry_date', 'exit_date', 'realized_pnl')
+    list_filter = ('status', 'trade_type', 'is_backtest')
+    search_fields = ('symbol', 'user__username')
+    raw_id_fields = ('user', 'strategy')
+
+    def delete_queryset(self, request, queryset):
+        # Recompute each affected portfolio once instead of once per trade
+        with defer_balance_updates():
+            super().delete_queryset(request, queryset)
+
+@admin.register(Strategy)
+class StrategyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'created_at')
+    search_fields = ('name', 'user__username')
@@ -0,0 +1,180 @@
+"""
+Trade performance analytics shared by the dashboard, the PDF trade report and
+the portfolio page.
+
+A user's closed live trades (backtests excluded) are loaded once as column arrays (exit day, realized
+P&L and initial risk) and every metric and time series is computed from them with
+vectorised NumPy operations. Per-strategy, per-symbol and per-emotion
+breakdowns are aggregated by the database instead, one GROUP BY per dimension.
+"""
+import calendar
+
+import numpy as np
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Abs, TruncDate
+from django.utils import timezone
+
+from .models import Trade
+from .risk import RiskMetrics
+
+
+class TradeAnalytics:
+    """Performance metrics and series for a set of closed trades"""
+
+    def __init__(self, days, pnl, months=12, today=None, risk=None):
+        """
+        days: datetime64[D] array of local exit days (NaT when unknown)
+        pnl: float array of realized P&L, in the same order as days
+        risk: float array of the initial risk of each trade (NaN without a stop loss)
+        """
+        self.days = days
+        self.pnl = pnl
+        self.risk = risk if risk is not None else np.full(pnl.size, np.nan)
+
+        wins = pnl > 0
+        losses = pnl < 0
+        self.total_closed = int(pnl.size)
+        self.winning_trades = int(np.count_nonzero(wins))
+        self.losing_trades = int(np.count_nonzero(losses))
+        self.breakeven_trades = self.total_closed - self.winning_trades - self.losing_trades
+
+        self.total_pnl = float(pnl.sum())
+        self.gross_profit = float(pnl[wins].sum())
+        self.gross_loss = float(-pnl[losses].sum())
+        self.largest_win = float(pnl[wins].max()) if self.winning_trades else 0.0
+        self.largest_loss = float(pnl[losses].min()) if self.losing_trades else 0.0
+
+        self.win_rate = self.winning_trades / self.total_closed * 100 if self.total_closed else 0.0
+        self.profit_factor = self.gross_profit / self.gross_loss if self.gross_loss > 0 else float('inf')
+        self.avg_win = self.gross_profit / self.winning_trades if self.winning_trades else 0.0
+        self.avg_loss = self.gross_loss / self.losing_trades if self.losing_trades else 0.0
+        if self.total_closed:
+            self.expectancy = (
+                self.winning_trades / self.total_closed * self.avg_win
+                - self.losing_trades / self.total_closed * self.avg_loss
+            )
+        else:
+            self.expectancy = 0.0
+
+        self._build_series(months, today or timezone.localdate())
+
+    def _build_series(self, months, today):
+        # Cumulative P&L over dated, non-zero trades (days are already sorted)
+        dated = ~np.isnat(self.days) & (self.pnl != 0)
+        self.series_days = self.days[dated]
+        self.cumulative_pnl = np.round(np.cumsum(self.pnl[dated]), 2)
+
+        # P&L per calendar month over the trailing period
+        cutoff = np.datetime64(today, 'D') - np.timedelta64(365 * months // 12, 'D')
+        recent = dated & (self.days >= cutoff)
+        month_keys = self.days[recent].astype('datetime64[M]')
+        unique_months, index = np.unique(month_keys, return_inverse=True)
+        self.months = unique_months
+        self.monthly_pnl = np.round(np.bincount(index, weights=self.pnl[recent], minlength=unique_months.size), 2)
+
+    def risk_metrics(self, capital):
+        """Drawdown, Sharpe/Sortino, streaks and R-multiples on top of a starting capital"""
+        return RiskMetrics(self.days, self.pnl, self.risk, capital)
+
+    @property
+    def chart_labels(self):
+        return np.datetime_as_string(self.series_days, unit='D').tolist()
+
+    @property
+    def chart_data(self):
+        return self.cumulative_pnl.tolist()
+
+    @property
+    def monthly_labels(self):
+        month_numbers = self.months.astype(int) % 12 + 1
+        return [calendar.month_abbr[number] for number in month_numbers]
+
+    @property
+    def monthly_data(self):
+        return self.monthly_pnl.tolist()
+
+
+def closed_trade_arrays(user):
+    """
+    Load the exit days, realized P&L and initial risk (|entry - stop loss| x
+    quantity, None without a stop loss) of a user's closed live trades as arrays
+    """
+    rows = Trade.objects.filter(
+        user=user, status='CLOSED', realized_pnl__isnull=False, is_backtest=False
+    ).annotate(
+        day=TruncDate('exit_date'),
+        risk=Abs(F('entry_price') - F('stop_loss')) * F('quantity'),
+    ).order_by('exit_date', 'pk').values_list('day', 'realized_pnl', 'risk')
+    rows = list(rows)
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float), np.array([], dtype=float)
+    days, pnl, risk = zip(*rows)
+    return (
+        np.array(days, dtype='datetime64[D]'),
+        np.array(pnl, dtype=float),
+        # None (no stop loss) becomes NaN
+        np.array(risk, dtype=float),
+    )
+
+
+def analyze_trades(user, months=12):
+    """Compute TradeAnalytics for all of a user's closed live (not backtest) trades"""
+    days, pnl, risk = closed_trade_arrays(user)
+    return TradeAnalytics(days, pnl, months=months, risk=risk)
+
+
+# Dimension name -> (grouping columns, label of a row)
+BREAKDOWN_DIMENSIONS = {
+    'strategy': (
+        ('strategy_id', 'strategy__name'),
+        lambda row: row['strategy__name'] or 'No strategy',
+    ),
+    'symbol': (
+        ('symbol',),
+        lambda row: row['symbol'],
+    ),
+    'emotion': (
+        ('emotion',),
+        lambda row: dict(Trade.EMOTION_CHOICES).get(row['emotion'], row['emotion']),
+    ),
+}
+
+
+def performance_breakdown(user, dimension):
+    """
+    Closed live trade performance of a user grouped by one dimension, as a list
+    of rows with trade count, win rate, total and average P&L and profit factor
+    (None when the group has no losing trades). Best groups come first.
+    """
+    columns, label = BREAKDOWN_DIMENSIONS[dimension]
+    groups = Trade.objects.filter(
+        user=user, status='CLOSED', realized_pnl__isnull=False, is_backtest=False
+    ).values(*columns).annotate(
+        trades=Count('id'),
+        wins=Count('id', filter=Q(realized_pnl__gt=0)),
+        total_pnl=Sum('realized_pnl'),
+        gross_profit=Sum('realized_pnl', filter=Q(realized_pnl__gt=0)),
+        gross_loss=Sum('realized_pnl', filter=Q(realized_pnl__lt=0)),
+    ).order_by('-total_pnl', *columns)
+
+    rows = []
+    for group in groups:
+        total_pnl = float(group['total_pnl'])
+        gross_profit = float(group['gross_profit'] or 0)
+        gross_loss = -float(group['gross_loss'] or 0)
+        rows.append({
+            'key': group[columns[0]],
+            'label': label(group),
+            'trades': group['trades'],
+            'wins': group['wins'],
+            'win_rate': round(group['wins'] / group['trades'] * 100, 1),
+            'total_pnl': round(total_pnl, 2),
+            'avg_pnl': round(total_pnl / group['trades'], 2),
+            'profit_factor': round(gross_profit / gross_loss, 2) if gross_loss > 0 else None,
+        })
+    return rows
+
+
+def performance_breakdowns(user):
+    """performance_breakdown() for every dimension, keyed by dimension name"""
+    return {dimension: performance_breakdown(user, dimension) for dimension in BREAKDOWN_DIMENSIONS}
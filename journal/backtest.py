@@ -0,0 +1,230 @@
+"""
+Backtests of a Strategy's rules over the local end-of-day price history.
+
+Strategy.rules is a small JSON definition, for example
+
+    {
+        "symbols": ["NABIL", "NICA"],
+        "entry": {"ma_cross_above": [10, 50], "close_above": 300},
+        "exit": {"below_ma": 50},
+        "stop_loss_pct": 5,
+        "target_pct": 15,
+        "max_holding_days": 30,
+        "quantity": 100
+    }
+
+Long positions are opened at the close of a day on which every entry
+condition holds, and closed at the first later day on which any exit
+condition holds (at the close), the low reaches the stop loss or the high
+reaches the target (at that price, or the open if it gapped through), or
+max_holding_days trading days have passed. A position whose holding period
+runs out on the last day is closed at that day's close; positions still open
+at the end of the history stay open. Without "symbols" every symbol in the
+price store is tested.
+
+Entry and exit signals are computed for a whole symbol at once with NumPy;
+symbols are backtested in parallel worker processes and the resulting
+trades are bulk-created as is_backtest trades, which are kept out of the
+portfolio balance, snapshots and analytics.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from decimal import Decimal
+
+import django
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.cache import bump_user_cache_version
+from market.store import price_store
+from .models import Trade
+from .rules import validate_rules
+
+# Backtest fills are stamped at the NEPSE close
+MARKET_CLOSE = time(15, 0)
+
+
+def moving_average(close, window):
+    """Simple moving average of close over window days (NaN for the first window - 1)"""
+    average = np.full(close.size, np.nan)
+    if close.size >= window:
+        sums = np.cumsum(np.concatenate(([0.0], close)))
+        average[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return average
+
+
+def condition_mask(close, name, value):
+    """Days on which one condition holds, for a whole price history"""
+    if name == 'close_above':
+        return close > value
+    if name == 'close_below':
+        return close < value
+    if name in ('above_ma', 'below_ma'):
+        average = moving_average(close, value)
+        with np.errstate(invalid='ignore'):
+            return close > average if name == 'above_ma' else close < average
+    fast, slow = moving_average(close, value[0]), moving_average(close, value[1])
+    with np.errstate(invalid='ignore'):
+        above = fast > slow if name == 'ma_cross_above' else fast < slow
+    # The day the relation starts, not every day it holds
+    return above & ~np.concatenate(([True], above[:-1]))
+
+
+def signals(close, conditions, combine):
+    mask = np.ones(close.size, dtype=bool) if combine is np.logical_and else np.zeros(close.size, dtype=bool)
+    for name, value in conditions.items():
+        mask = combine(mask, condition_mask(close, name, value))
+    return mask
+
+
+def simulate(series, rules):
+    """
+    Replay rules over one symbol's PriceSeries. Returns a list of trades as
+    (entry index, entry price, exit index or None, exit price or None).
+    """
+    close = np.asarray(series.close)
+    if not close.size:
+        return []
+    entries = np.flatnonzero(signals(close, rules['entry'], np.logical_and))
+    exits = signals(close, rules.get('exit') or {}, np.logical_or)
+    stop_pct = rules.get('stop_loss_pct')
+    target_pct = rules.get('target_pct')
+    holding = rules.get('max_holding_days')
+
+    trades = []
+    position = 0
+    while position < entries.size:
+        entry = int(entries[position])
+        entry_price = float(close[entry])
+        last = close.size if holding is None else min(close.size, entry + holding + 1)
+        window = slice(entry + 1, last)
+
+        # Every day in the holding window that ends the trade, in one pass
+        ends = exits[window].copy()
+        stop_hits = target_hits = None
+        if stop_pct is not None:
+            stop = entry_price * (1 - stop_pct / 100)
+            stop_hits = np.asarray(series.low[window]) <= stop
+            ends |= stop_hits
+        if target_pct is not None:
+            target = entry_price * (1 + target_pct / 100)
+            target_hits = np.asarray(series.high[window]) >= target
+            ends |= target_hits
+
+        if ends.any():
+            offset = int(ends.argmax())
+            exit_day = entry + 1 + offset
+            # The stop is assumed to fill before the target on the same day
+            if stop_hits is not None and stop_hits[offset]:
+                exit_price = min(float(series.open[exit_day]), stop)
+            elif target_hits is not None and target_hits[offset]:
+                exit_price = max(float(series.open[exit_day]), target)
+            else:
+                exit_price = float(close[exit_day])
+        elif holding is not None and entry + holding < close.size:
+            exit_day, exit_price = entry + holding, float(close[entry + holding])
+        else:
+            trades.append((entry, entry_price, None, None))
+            break
+        trades.append((entry, entry_price, exit_day, exit_price))
+        # The next position opens on the first entry signal after this exit
+        position = int(np.searchsorted(entries, exit_day, side='right'))
+    return trades
+
+
+def backtest_symbol(rules, symbol, start=None, end=None):
+    """Backtest one symbol; returns (symbol, trades) with dates as ISO strings"""
+    if symbol not in price_store:
+        return symbol, []
+    series = price_store.range(symbol, start, end)
+    dates = series.dates
+    return symbol, [
+        (
+            str(dates[entry]), entry_price,
+            str(dates[exit_day]) if exit_day is not None else None, exit_price,
+        )
+        for entry, entry_price, exit_day, exit_price in simulate(series, rules)
+    ]
+
+
+def fill_datetime(day):
+    return timezone.make_aware(datetime.combine(datetime.fromisoformat(day).date(), MARKET_CLOSE))
+
+
+def price(value):
+    return Decimal(str(round(value, 2)))
+
+
+def build_trades(strategy, symbol, fills, quantity, stop_loss_pct, target_pct):
+    for entry_day, entry_price, exit_day, exit_price in fills:
+        trade = Trade(
+            user_id=strategy.user_id,
+            strategy=strategy,
+            symbol=symbol,
+            trade_type='BUY',
+            quantity=quantity,
+            entry_price=price(entry_price),
+            entry_date=fill_datetime(entry_day),
+            stop_loss=price(entry_price * (1 - stop_loss_pct / 100)) if stop_loss_pct else None,
+            target=price(entry_price * (1 + target_pct / 100)) if target_pct else None,
+            is_backtest=True,
+            notes=f'Backtest of {strategy.name}',
+        )
+        if exit_day is not None:
+            trade.status = 'CLOSED'
+            trade.exit_price = price(exit_price)
+            trade.exit_date = fill_datetime(exit_day)
+        # bulk_create() skips Trade.save(), so store the P&L here
+        trade.realized_pnl = trade.pnl
+        yield trade
+
+
+def run_backtest(strategy, symbols=None, start=None, end=None, workers=1, replace=False,
+                 dry_run=False, on_progress=None):
+    """
+    Backtest strategy.rules over symbols (default: the rules' symbols, else the
+    whole price store) between start and end, and bulk-create the trades.
+
+    With replace, the strategy's earlier backtest trades in these symbols are
+    deleted first.
+    on_progress(done, total) is called as symbols finish. Returns the number
+    of trades per symbol.
+    """
+    rules = strategy.rules
+    validate_rules(rules)
+    if not rules:
+        raise ValidationError(f'Strategy "{strategy.name}" has no backtest rules')
+    symbols = [s.strip().upper() for s in symbols or rules.get('symbols') or price_store.symbols()]
+
+    results = {}
+    if workers > 1 and len(symbols) > 1:
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+            futures = [executor.submit(backtest_symbol, rules, symbol, start, end) for symbol in symbols]
+            for done, future in enumerate(futures, 1):
+                symbol, fills = future.result()
+                results[symbol] = fills
+                if on_progress:
+                    on_progress(done, len(symbols))
+    else:
+        for done, symbol in enumerate(symbols, 1):
+            results[symbol] = backtest_symbol(rules, symbol, start, end)[1]
+            if on_progress:
+                on_progress(done, len(symbols))
+
+    if not dry_run:
+        quantity = rules.get('quantity', 10)
+        with transaction.atomic():
+            if replace:
+                Trade.objects.filter(strategy=strategy, is_backtest=True, symbol__in=list(results)).delete()
+            for symbol, fills in results.items():
+                Trade.objects.bulk_create(
+                    build_trades(strategy, symbol, fills, quantity, rules.get('stop_loss_pct'), rules.get('target_pct')),
+                    batch_size=1000,
+                )
+            # bulk_create() sends no post_save, so invalidate the cached pages here
+            transaction.on_commit(lambda: bump_user_cache_version(strategy.user_id))
+    return {symbol: len(fills) for symbol, fills in results.items()}
@@ -1,10 +1,27 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
-from .models import Trade, TradeImage, Strategy
+from django.utils import timezone
+from .models import Trade, TradeImage, Strategy, get_strategy_choices
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
 
 class StrategyForm(forms.ModelForm):
     class Meta:
         model = Strategy
-        fields = ['name', 'description']
+        fields = ['name', 'description', 'rules']
+        widgets = {
+            'rules': forms.Textarea(attrs={
+                'rows': 6,
+                'placeholder': '{"entry": {"ma_cross_above": [10, 50]}, "exit": {"below_ma": 50}, "stop_loss_pct": 5, "quantity": 100}',
+            }),
+        }
+
+    def clean_rules(self):
+        # An empty field means no backtest rules
+        return self.cleaned_data['rules'] or {}
 
 class TradeForm(forms.ModelForm):
     class Meta:
@@ -18,25 +35,64 @@ class TradeForm(forms.ModelForm):
     
     def __init__(self, user, *args, **kwargs):
         super(TradeForm, self).__init__(*args, **kwargs)
-        strategies = Strategy.objects.filter(user=user)
-        self.fields['strategy'].queryset = strategies
-        
-        # If no strategies exist, create default ones
-        if not strategies.exists():
-            default_strategies = [
-                {'name': 'Swing Trading', 'description': 'Medium-term trading strategy'},
-                {'name': 'Day Trading', 'description': 'Short-term intraday trading'},
-                {'name': 'Scalping', 'description': 'Very short-term trading'},
-                {'name': 'Position Trading', 'description': 'Long-term trading strategy'},
-            ]
-            
-            for strategy_data in default_strategies:
-                Strategy.objects.create(user=user, **strategy_data)
-            
-            # Refresh queryset
-            self.fields['strategy'].queryset = Strategy.objects.filter(user=user)
+        # The queryset is only evaluated to validate a submitted choice; the
+        # select box is built from the cached choices
+        field = self.fields['strategy']
+        field.queryset = Strategy.objects.filter(user=user)
+        field.choices = [('', field.empty_label)] + get_strategy_choices(user.pk)
 
 class TradeImageForm(forms.ModelForm):
     class Meta:
         model = TradeImage
         fields = ['image', 'caption']
+
+class TradeImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label='CSV file',
+        help_text='Broker CSV or TMS trade-book export with Symbol, Type (Buy/Sell), Quantity, Price and Date columns',
+    )
+    dry_run = forms.BooleanField(required=False, label='Validate only (do not save trades)')
+
+class TradeFilterForm(forms.Form):
+    BACKTEST_CHOICES = (
+        ('', 'All trades'),
+        ('live', 'Live only'),
+        ('backtest', 'Backtest only'),
+    )
+
+    symbol = forms.CharField(required=False, max_length=20)
+    status = forms.ChoiceField(required=False, choices=(('', 'All'),) + Trade.STATUS_CHOICES)
+    type = forms.ChoiceField(required=False, choices=(('', 'All'),) + Trade.TRADE_TYPES)
+    strategy = forms.ModelChoiceField(required=False, queryset=Strategy.objects.none(), empty_label='All')
+    start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    backtest = forms.ChoiceField(required=False, choices=BACKTEST_CHOICES)
+
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['strategy']
+        field.queryset = Strategy.objects.filter(user=user)
+        field.choices = [('', field.empty_label)] + get_strategy_choices(getattr(user, 'pk', user))
+
+    def filter(self, queryset):
+        """Apply the valid filters to a Trade queryset"""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['symbol']:
+            queryset = queryset.filter(symbol=data['symbol'].strip().upper())
+        if data['status']:
+            queryset = queryset.filter(status=data['status'])
+        if data['type']:
+            queryset = queryset.filter(trade_type=data['type'])
+        if data['strategy']:
+            queryset = queryset.filter(strategy=data['strategy'])
+        # Compare against datetime bounds (not entry_date__date) so the
+        # date range stays an index range scan
+        if data['start_date']:
+            queryset = queryset.filter(entry_date__gte=start_of_day(data['start_date']))
+        if data['end_date']:
+            queryset = queryset.filter(entry_date__lt=start_of_day(data['end_date'] + timedelta(days=1)))
+        if data['backtest']:
+            queryset = queryset.filter(is_backtest=data['backtest'] == 'backtest')
+        return queryset
@@ -0,0 +1,187 @@
+"""
+Streaming import of trades from broker CSV and TMS trade-book exports.
+
+Rows are read one at a time from the uploaded file, validated in batches and
+written with bulk_create, so memory use does not grow with the file size.
+Portfolio balances are recomputed once at the end of the import.
+"""
+import csv
+import io
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.csv_utils import CSVResult, check_utf8, map_columns, parse_decimal, parse_datetime as parse_naive_datetime
+from portfolio.batching import defer_balance_updates, mark_user_dirty
+from .models import Strategy, Trade
+
+# Accepted header names (lower-cased) for each Trade field
+COLUMN_ALIASES = {
+    'symbol': ('symbol', 'stock symbol', 'scrip', 'stock', 'script'),
+    'trade_type': ('type', 'trade type', 'buy/sell', 'side', 'transaction type'),
+    'quantity': ('quantity', 'qty', 'units', 'kitta'),
+    'entry_price': ('entry price', 'buy price', 'rate', 'price'),
+    'exit_price': ('exit price', 'sell price'),
+    'entry_date': ('entry date', 'date', 'trade date', 'transaction date', 'business date'),
+    'exit_date': ('exit date', 'close date'),
+    'stop_loss': ('stop loss', 'stoploss', 'sl'),
+    'target': ('target', 'tp'),
+    'status': ('status',),
+    'strategy': ('strategy',),
+    'notes': ('notes', 'remarks', 'note'),
+}
+
+REQUIRED_COLUMNS = ('symbol', 'trade_type', 'quantity', 'entry_price', 'entry_date')
+
+TRADE_TYPE_VALUES = {
+    'BUY': 'BUY', 'B': 'BUY', 'PURCHASE': 'BUY',
+    'SELL': 'SELL', 'S': 'SELL', 'SALE': 'SELL',
+}
+
+
+class ImportResult(CSVResult):
+    """Outcome of an import: rows read, trades created and per-row (line, message) errors"""
+
+    def __init__(self, max_errors=1000):
+        super().__init__(max_errors=max_errors)
+        self.created = 0
+
+
+def parse_price(value, field):
+    """Parse a price cell so that it fits the Trade DecimalField it is stored in"""
+    model_field = Trade._meta.get_field(field)
+    return parse_decimal(value, max_digits=model_field.max_digits, decimal_places=model_field.decimal_places)
+
+
+def parse_datetime(value):
+    parsed = parse_naive_datetime(value)
+    return timezone.make_aware(parsed) if parsed is not None else None
+
+
+def build_trade(user, row, mapping, strategies):
+    """Validate one CSV row and return an unsaved Trade"""
+    def cell(field):
+        index = mapping.get(field)
+        if index is None or index >= len(row):
+            return ''
+        return row[index].strip()
+
+    symbol = cell('symbol').upper()
+    if not symbol:
+        raise ValueError('Symbol is required')
+    if len(symbol) > 20:
+        raise ValueError(f"Symbol '{symbol}' is too long")
+
+    trade_type = TRADE_TYPE_VALUES.get(cell('trade_type').upper())
+    if trade_type is None:
+        raise ValueError(f"Unknown trade type '{cell('trade_type')}'")
+
+    quantity = parse_decimal(cell('quantity'), decimal_places=None)
+    if quantity is None or quantity <= 0 or quantity != quantity.to_integral_value():
+        raise ValueError('Quantity must be a positive whole number')
+    if quantity > connection.ops.integer_field_range('PositiveIntegerField')[1]:
+        raise ValueError(f"Quantity '{cell('quantity')}' is too large")
+
+    entry_price = parse_price(cell('entry_price'), 'entry_price')
+    if entry_price is None:
+        raise ValueError('Entry price is required')
+    entry_date = parse_datetime(cell('entry_date'))
+    if entry_date is None:
+        raise ValueError('Entry date is required')
+
+    exit_price = parse_price(cell('exit_price'), 'exit_price')
+    status = cell('status').upper() or ('CLOSED' if exit_price is not None else 'OPEN')
+    if status not in dict(Trade.STATUS_CHOICES):
+        raise ValueError(f"Unknown status '{cell('status')}'")
+
+    strategy_name = cell('strategy')
+    strategy_id = None
+    if strategy_name:
+        strategy_id = strategies.get(strategy_name.lower())
+        if strategy_id is None:
+            raise ValueError(f"Unknown strategy '{strategy_name}'")
+
+    trade = Trade(
+        user=user,
+        symbol=symbol,
+        trade_type=trade_type,
+        quantity=int(quantity),
+        entry_price=entry_price,
+        exit_price=exit_price,
+        entry_date=entry_date,
+        exit_date=parse_datetime(cell('exit_date')),
+        stop_loss=parse_price(cell('stop_loss'), 'stop_loss'),
+        target=parse_price(cell('target'), 'target'),
+        strategy_id=strategy_id,
+        status=status,
+        notes=cell('notes'),
+    )
+    # bulk_create() skips Trade.save(), so store the P&L here
+    trade.realized_pnl = trade.pnl
+    return trade
+
+
+def import_trades(user, stream, batch_size=500, dry_run=False, max_errors=1000):
+    """
+    Import trades for user from a text stream of CSV data.
+
+    Valid rows are inserted in batches of batch_size. Invalid rows are skipped
+    and reported in the returned ImportResult. With dry_run nothing is saved.
+    """
+    result = ImportResult(max_errors=max_errors)
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        result.add_error(1, 'The file is empty')
+        return result
+    try:
+        mapping = map_columns(header, COLUMN_ALIASES, REQUIRED_COLUMNS)
+    except ValueError as e:
+        result.add_error(1, str(e))
+        return result
+
+    strategies = {
+        name.lower(): pk
+        for pk, name in Strategy.objects.filter(user=user).values_list('pk', 'name')
+    }
+
+    def flush(batch):
+        trades = []
+        for line, row in batch:
+            try:
+                trades.append(build_trade(user, row, mapping, strategies))
+            except ValueError as e:
+                result.add_error(line, str(e))
+        if trades and not dry_run:
+            with transaction.atomic():
+                Trade.objects.bulk_create(trades, batch_size=batch_size)
+            mark_user_dirty(user.pk)
+        result.created += len(trades)
+
+    with defer_balance_updates():
+        batch = []
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            result.rows += 1
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    return result
+
+
+def import_trades_from_upload(user, uploaded_file, **kwargs):
+    """
+    Import trades from a Django UploadedFile without reading it into memory.
+    Raises ValueError, before importing anything, if the file is not UTF-8.
+    """
+    check_utf8(uploaded_file.chunks())
+    uploaded_file.seek(0)
+    stream = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    try:
+        return import_trades(user, stream, **kwargs)
+    finally:
+        stream.detach()
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.csv_utils import check_utf8
+from journal.importers import import_trades
+
+class Command(BaseCommand):
+    help = 'Import trades for a user from a broker CSV or TMS trade-book export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User who owns the imported trades')
+        parser.add_argument('csv_path', help='Path to the CSV file')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and inserted per batch (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without saving any trades')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+        
+        with open(options['csv_path'], 'rb') as raw:
+            try:
+                check_utf8(iter(lambda: raw.read(64 * 1024), b''))
+            except ValueError as e:
+                raise CommandError(str(e))
+        with open(options['csv_path'], encoding='utf-8-sig', newline='') as stream:
+            result = import_trades(
+                user, stream, batch_size=max(options['batch_size'], 1), dry_run=options['dry_run']
+            )
+        
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.truncated_errors:
+            self.stderr.write(f'... and {result.truncated_errors} more errors')
+        
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} of {result.rows} rows ({result.error_count} errors)'
+        ))
@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from journal.backtest import run_backtest
+from journal.models import Strategy
+
+
+class Command(BaseCommand):
+    help = "Backtest a strategy's rules over the local price history and save the trades as backtest trades"
+
+    def add_arguments(self, parser):
+        parser.add_argument('strategy_id', type=int, help='Primary key of the strategy to backtest')
+        parser.add_argument('--symbols', nargs='+', help="Symbols to test (default: the rules' symbols, else every stored symbol)")
+        parser.add_argument('--start', type=date.fromisoformat, help='First day of history to use (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day of history to use (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
+        parser.add_argument('--replace', action='store_true', help="Delete the strategy's earlier backtest trades in the tested symbols first")
+        parser.add_argument('--dry-run', action='store_true', help='Run the backtest without saving any trades')
+
+    def handle(self, *args, **options):
+        strategy = Strategy.objects.select_related('user').filter(pk=options['strategy_id']).first()
+        if strategy is None:
+            raise CommandError(f"Strategy {options['strategy_id']} does not exist")
+
+        self.stdout.write(self.style.WARNING(
+            f'Backtesting "{strategy.name}" for {strategy.user.username} with {max(options["workers"], 1)} workers...'
+        ))
+
+        def on_progress(done, total):
+            self.stdout.write(f'Progress: {done}/{total}')
+
+        try:
+            counts = run_backtest(
+                strategy,
+                symbols=options['symbols'],
+                start=options['start'],
+                end=options['end'],
+                workers=max(options['workers'], 1),
+                replace=options['replace'],
+                dry_run=options['dry_run'],
+                on_progress=on_progress,
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        for symbol, count in counts.items():
+            if count:
+                self.stdout.write(f'{symbol}: {count} trades')
+        verb = 'Found' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sum(counts.values())} backtest trades over {len(counts)} symbols'
+        ))
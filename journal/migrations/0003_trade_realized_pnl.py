@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, F, When
+
+
+def backfill_realized_pnl(apps, schema_editor):
+    Trade = apps.get_model('journal', 'Trade')
+    Trade.objects.filter(status='CLOSED', exit_price__isnull=False).exclude(exit_price=0).update(
+        realized_pnl=Case(
+            When(trade_type='SELL', then=(F('entry_price') - F('exit_price')) * F('quantity')),
+            default=(F('exit_price') - F('entry_price')) * F('quantity'),
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0002_trade_emotion_trade_is_backtest_strategy_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='realized_pnl',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=15, null=True),
+        ),
+        migrations.RunPython(backfill_realized_pnl, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'status', 'exit_date'], name='trade_user_status_exit_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_trade_realized_pnl'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'entry_date', 'id'], name='trade_user_entry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'symbol', 'entry_date', 'id'], name='trade_user_symbol_entry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'status', 'entry_date', 'id'], name='trade_user_status_entry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'strategy', 'entry_date', 'id'], name='trade_user_strat_entry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'is_backtest', 'entry_date', 'id'], name='trade_user_bt_entry_idx'),
+        ),
+    ]
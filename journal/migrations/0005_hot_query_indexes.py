@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_trade_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['entry_date'], name='trade_entry_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:45
+
+from django.conf import settings
+from django.db import migrations
+
+DEFAULT_STRATEGIES = (
+    ('Swing Trading', 'Medium-term trading strategy'),
+    ('Day Trading', 'Short-term intraday trading'),
+    ('Scalping', 'Very short-term trading'),
+    ('Position Trading', 'Long-term trading strategy'),
+)
+
+
+def seed_default_strategies(apps, schema_editor):
+    """Give every existing user without strategies the defaults TradeForm used to create"""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Strategy = apps.get_model('journal', 'Strategy')
+    users = User.objects.filter(strategies__isnull=True).values_list('pk', flat=True)
+    Strategy.objects.bulk_create([
+        Strategy(user_id=user_id, name=name, description=description)
+        for user_id in users.iterator()
+        for name, description in DEFAULT_STRATEGIES
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0005_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_default_strategies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:52
+
+import journal.rules
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0006_seed_default_strategies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strategy',
+            name='rules',
+            field=models.JSONField(blank=True, default=dict, help_text='Backtest rules: entry/exit conditions, stop loss, target and quantity (see journal/backtest.py)', validators=[journal.rules.validate_rules]),
+        ),
+    ]
@@ -1,11 +1,26 @@
 from django.db import models
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
+from .rules import validate_rules
+
+DEFAULT_STRATEGIES = (
+    {'name': 'Swing Trading', 'description': 'Medium-term trading strategy'},
+    {'name': 'Day Trading', 'description': 'Short-term intraday trading'},
+    {'name': 'Scalping', 'description': 'Very short-term trading'},
+    {'name': 'Position Trading', 'description': 'Long-term trading strategy'},
+)
 
 class Strategy(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='strategies')
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    rules = models.JSONField(
+        default=dict, blank=True, validators=[validate_rules],
+        help_text='Backtest rules: entry/exit conditions, stop loss, target and quantity (see journal/backtest.py)',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -51,12 +66,35 @@ class Trade(models.Model):
     notes = models.TextField(blank=True)
     status = models.CharField(max_length=6, choices=STATUS_CHOICES, default='OPEN')
     
+    # Stored copy of pnl so analytics can aggregate it in SQL
+    realized_pnl = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'exit_date'], name='trade_user_status_exit_idx'),
+            # Trade list: keyset pagination on (entry_date, id) per filter
+            models.Index(fields=['user', 'entry_date', 'id'], name='trade_user_entry_idx'),
+            models.Index(fields=['user', 'symbol', 'entry_date', 'id'], name='trade_user_symbol_entry_idx'),
+            models.Index(fields=['user', 'status', 'entry_date', 'id'], name='trade_user_status_entry_idx'),
+            models.Index(fields=['user', 'strategy', 'entry_date', 'id'], name='trade_user_strat_entry_idx'),
+            models.Index(fields=['user', 'is_backtest', 'entry_date', 'id'], name='trade_user_bt_entry_idx'),
+            # Admin dashboard and exports: latest trades across all users
+            models.Index(fields=['entry_date'], name='trade_entry_idx'),
+        ]
+
     def __str__(self):
         return f"{self.symbol} - {self.trade_type} ({self.entry_date.date()})"
 
+    def save(self, *args, **kwargs):
+        self.realized_pnl = self.pnl
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'realized_pnl' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['realized_pnl']
+        super().save(*args, **kwargs)
+
     @property
     def pnl(self):
         if self.exit_price and self.status == 'CLOSED':
@@ -74,3 +112,34 @@ class TradeImage(models.Model):
 
     def __str__(self):
         return f"Image for {self.trade}"
+
+
+def seed_default_strategies(user):
+    """Give a new user the default strategies; returns the created Strategy objects"""
+    return Strategy.objects.bulk_create([
+        Strategy(user=user, **strategy) for strategy in DEFAULT_STRATEGIES
+    ])
+
+
+def _strategy_choices_key(user_id):
+    return f'strategy-choices:{user_id}'
+
+
+def get_strategy_choices(user_id):
+    """(pk, name) of a user's strategies for form select boxes, cached until they change"""
+    key = _strategy_choices_key(user_id)
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(Strategy.objects.filter(user_id=user_id).order_by('pk').values_list('pk', 'name'))
+        cache.set(key, choices, None)
+    return choices
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_default_strategies(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        seed_default_strategies(instance)
+
+@receiver([post_save, post_delete], sender=Strategy)
+def invalidate_strategy_choices(sender, instance, **kwargs):
+    cache.delete(_strategy_choices_key(instance.user_id))
@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination on (entry_date, id), newest first.
+
+Each page is fetched with a range condition on the sort key instead of an
+OFFSET, so page N costs the same as page 1 and uses the (…, entry_date, id)
+indexes on Trade. Cursors are opaque URL-safe strings encoding the sort key of
+the first or last row of a page.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(trade):
+    raw = f'{trade.entry_date.isoformat()}|{trade.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (entry_date, pk) from a cursor, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        entry_date, pk = raw.rsplit('|', 1)
+        entry_date, pk = datetime.fromisoformat(entry_date), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    # Cursors are always written with a UTC offset
+    if entry_date.tzinfo is None:
+        return None
+    return entry_date, pk
+
+
+class KeysetPage:
+    """One page of results with cursors to its neighbours"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_paginate(queryset, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Return the KeysetPage of queryset following the ``after`` cursor, or
+    preceding the ``before`` cursor, ordered by entry_date and id descending.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before:
+        entry_date, pk = before
+        rows = list(
+            queryset.filter(Q(entry_date__gt=entry_date) | Q(entry_date=entry_date, pk__gt=pk))
+            .order_by('entry_date', 'pk')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if has_more else None,
+        )
+
+    if after:
+        entry_date, pk = after
+        queryset = queryset.filter(Q(entry_date__lt=entry_date) | Q(entry_date=entry_date, pk__lt=pk))
+    rows = list(queryset.order_by('-entry_date', '-pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if has_more else None,
+        previous_cursor=encode_cursor(items[0]) if after and items else None,
+    )
@@ -0,0 +1,129 @@
+"""
+Risk metrics over a user's closed trades: drawdown, risk-adjusted returns,
+win/loss streaks and R-multiples.
+
+Everything is computed from the column arrays loaded by
+journal.analytics.closed_trade_arrays with vectorised NumPy operations, in
+O(n) over the trades plus the trading days they span, so the metrics stay
+cheap for journals with tens of thousands of trades.
+"""
+import numpy as np
+
+# NEPSE trades Sunday to Thursday, roughly 240 sessions a year
+TRADING_WEEKMASK = 'Sun Mon Tue Wed Thu'
+TRADING_DAYS_PER_YEAR = 240
+
+# Deviations of daily returns at or below this are treated as zero
+ZERO_DEVIATION = 1e-12
+
+
+def runs(mask):
+    """Start and end (exclusive) indexes of the runs of consecutive True values in a bool array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def longest_run(mask):
+    """Length of the longest run of consecutive True values in a bool array"""
+    if not mask.any():
+        return 0
+    starts, ends = runs(mask)
+    return int((ends - starts).max())
+
+
+def daily_pnl(days, pnl):
+    """
+    Sum P&L per trading day from the first to the last exit day, with zeros
+    on trading days without exits. Returns (trading days, P&L per day).
+    """
+    dated = ~np.isnat(days)
+    days, pnl = days[dated], pnl[dated]
+    if not days.size:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+    first = days.min()
+    offsets = (days - first).astype(np.int64)
+    totals = np.bincount(offsets, weights=pnl)
+    calendar = first + np.arange(totals.size)
+    trading = np.is_busday(calendar, weekmask=TRADING_WEEKMASK)
+    # P&L booked on a holiday (data entry on a Friday, say) still counts
+    trading |= totals != 0
+    return calendar[trading], totals[trading]
+
+
+def drawdown(days, equity):
+    """
+    Maximum drawdown of an equity curve, as an amount and a percentage of the
+    peak, and the longest time in days spent below a previous peak (including
+    a drawdown that has not recovered yet). All zero without a drawdown.
+    """
+    if not equity.size:
+        return 0.0, 0.0, 0
+    peaks = np.maximum.accumulate(equity)
+    underwater = equity - peaks
+    below = underwater < 0
+    if not below.any():
+        return 0.0, 0.0, 0
+    worst = int(underwater.argmin())
+    amount = max(0.0, float(-underwater[worst]))
+    percent = float(amount / peaks[worst] * 100) if peaks[worst] > 0 else 0.0
+
+    # A drawdown lasts from the peak before it (the first point is always a
+    # peak) to the day equity is back at that peak, or to the last day if it
+    # has not recovered yet
+    starts, ends = runs(below)
+    durations = (days[np.minimum(ends, equity.size - 1)] - days[starts - 1]).astype(np.int64)
+    return amount, percent, int(durations.max())
+
+
+def sharpe_sortino(returns):
+    """Annualised Sharpe and Sortino ratios of daily returns (None when undefined)"""
+    if returns.size < 2:
+        return None, None
+    scale = np.sqrt(TRADING_DAYS_PER_YEAR)
+    mean = returns.mean()
+    deviation = returns.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    # Constant returns leave rounding noise in the deviation, not zero
+    sharpe = float(mean / deviation * scale) if deviation > ZERO_DEVIATION else None
+    sortino = float(mean / downside * scale) if downside > ZERO_DEVIATION else None
+    return sharpe, sortino
+
+
+class RiskMetrics:
+    """Drawdown, Sharpe/Sortino, streak and R-multiple metrics for closed trades"""
+
+    def __init__(self, days, pnl, risk, capital):
+        """
+        days, pnl: the exit days and realized P&L of TradeAnalytics, in exit order
+        risk: float array of the initial risk of each trade, |entry - stop loss|
+            times quantity (NaN when the trade has no stop loss)
+        capital: starting equity the P&L is added to
+        """
+        capital = float(capital)
+
+        # Equity at the close of every trading day
+        self.days, day_pnl = daily_pnl(days, pnl)
+        equity = capital + np.cumsum(day_pnl)
+        # The starting capital is the first peak, so early losses count as drawdown
+        self.max_drawdown, self.max_drawdown_pct, self.max_drawdown_days = drawdown(
+            np.concatenate((self.days[:1], self.days)),
+            np.concatenate(([capital], equity)) if equity.size else equity,
+        )
+
+        previous = np.concatenate(([capital], equity[:-1]))
+        returns = np.divide(day_pnl, previous, out=np.zeros_like(day_pnl), where=previous > 0)
+        self.sharpe, self.sortino = sharpe_sortino(returns)
+
+        self.longest_win_streak = longest_run(pnl > 0)
+        self.longest_loss_streak = longest_run(pnl < 0)
+
+        with_stop = np.isfinite(risk) & (risk > 0)
+        self.r_multiples = pnl[with_stop] / risk[with_stop]
+        self.trades_with_stop = int(self.r_multiples.size)
+        if self.trades_with_stop:
+            self.avg_r = float(self.r_multiples.mean())
+            self.total_r = float(self.r_multiples.sum())
+            self.best_r = float(self.r_multiples.max())
+            self.worst_r = float(self.r_multiples.min())
+        else:
+            self.avg_r = self.total_r = self.best_r = self.worst_r = 0.0
@@ -0,0 +1,65 @@
+"""
+Validation of the backtest rule definitions stored in Strategy.rules; the
+rules themselves are described in journal.backtest.
+"""
+from django.core.exceptions import ValidationError
+
+# Conditions usable in "entry" (all must hold) and "exit" (any may hold)
+CONDITIONS = {
+    'close_above': 'price',
+    'close_below': 'price',
+    'above_ma': 'window',
+    'below_ma': 'window',
+    'ma_cross_above': 'windows',
+    'ma_cross_below': 'windows',
+}
+RULE_KEYS = {'symbols', 'entry', 'exit', 'stop_loss_pct', 'target_pct', 'max_holding_days', 'quantity'}
+
+
+def is_number(value):
+    # bool is a subclass of int, but JSON true/false are not numbers
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_whole_number(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_rules(rules):
+    """Validator for Strategy.rules; an empty definition means no backtest rules"""
+    if not rules:
+        return
+    if not isinstance(rules, dict):
+        raise ValidationError('Rules must be a JSON object')
+    unknown = set(rules) - RULE_KEYS
+    if unknown:
+        raise ValidationError(f"Unknown rule(s): {', '.join(sorted(unknown))}")
+    if not rules.get('entry'):
+        raise ValidationError('At least one entry condition is required')
+    for section in ('entry', 'exit'):
+        conditions = rules.get(section) or {}
+        if not isinstance(conditions, dict):
+            raise ValidationError(f'"{section}" must be a JSON object')
+        for name, value in conditions.items():
+            kind = CONDITIONS.get(name)
+            if kind is None:
+                raise ValidationError(f'Unknown {section} condition "{name}"')
+            if kind == 'price' and not (is_number(value) and value > 0):
+                raise ValidationError(f'"{name}" must be a positive price')
+            if kind == 'window' and not (is_whole_number(value) and value > 0):
+                raise ValidationError(f'"{name}" must be a positive number of days')
+            if kind == 'windows' and not (
+                isinstance(value, list) and len(value) == 2
+                and all(is_whole_number(window) and window > 0 for window in value)
+                and value[0] < value[1]
+            ):
+                raise ValidationError(f'"{name}" must be [fast, slow] day counts with fast < slow')
+    for name in ('stop_loss_pct', 'target_pct'):
+        if name in rules and not (is_number(rules[name]) and 0 < rules[name] < 100):
+            raise ValidationError(f'"{name}" must be a percentage between 0 and 100')
+    for name in ('max_holding_days', 'quantity'):
+        if name in rules and not (is_whole_number(rules[name]) and rules[name] > 0):
+            raise ValidationError(f'"{name}" must be a positive whole number')
+    symbols = rules.get('symbols')
+    if symbols is not None and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+        raise ValidationError('"symbols" must be a list of symbols')
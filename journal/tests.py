@@ -1,3 +1,382 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from market.store import COLUMNS, PriceSeries
+from portfolio.models import DailySnapshot, Portfolio
+from .backtest import simulate
+from .importers import import_trades, import_trades_from_upload
+from .models import Trade
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .risk import RiskMetrics, drawdown, sharpe_sortino
+from .rules import validate_rules
+
+
+def price_series(closes):
+    closes = np.array(closes, dtype=float)
+    dates = np.datetime64('2024-01-01', 'D') + np.arange(closes.size)
+    # Flat bars: open, high and low equal the close
+    return PriceSeries('TEST', dates, np.vstack([closes] * (len(COLUMNS) - 1) + [np.zeros(closes.size)]))
+
+
+class SimulateTests(SimpleTestCase):
+    rules = {'entry': {'close_above': 0}}
+
+    def test_holding_period_ending_on_last_bar_closes_at_last_close(self):
+        series = price_series([100, 101, 102, 103])
+        trades = simulate(series, {**self.rules, 'max_holding_days': 3})
+        self.assertEqual(trades, [(0, 100.0, 3, 103.0)])
+
+    def test_position_within_holding_period_at_end_stays_open(self):
+        series = price_series([100, 101, 102, 103])
+        trades = simulate(series, {**self.rules, 'max_holding_days': 4})
+        self.assertEqual(trades, [(0, 100.0, None, None)])
+
+
+class ValidateRulesTests(SimpleTestCase):
+    valid = {
+        'symbols': ['NABIL'],
+        'entry': {'ma_cross_above': [10, 50], 'close_above': 300},
+        'exit': {'below_ma': 50},
+        'stop_loss_pct': 5,
+        'target_pct': 15.5,
+        'max_holding_days': 30,
+        'quantity': 100,
+    }
+
+    def test_valid_rules(self):
+        validate_rules(self.valid)
+        validate_rules({})
+
+    def test_booleans_are_not_numbers(self):
+        invalid = [
+            {'max_holding_days': True},
+            {'quantity': True},
+            {'stop_loss_pct': True},
+            {'entry': {'above_ma': True}},
+            {'entry': {'close_above': True}},
+            {'entry': {'ma_cross_above': [True, 50]}},
+            {'exit': {'below_ma': True}},
+        ]
+        for change in invalid:
+            with self.subTest(change=change):
+                with self.assertRaises(ValidationError):
+                    validate_rules({**self.valid, **change})
+
+    def test_fractional_day_counts_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            validate_rules({**self.valid, 'max_holding_days': 2.5})
+
+
+def day_range(count, step=1):
+    return np.datetime64('2024-01-07', 'D') + np.arange(0, count * step, step)
+
+
+class DrawdownTests(SimpleTestCase):
+    def test_rising_equity_has_no_drawdown(self):
+        amount, percent, days = drawdown(day_range(4, step=3), np.array([100.0, 110.0, 120.0, 130.0]))
+        self.assertEqual((amount, percent, days), (0.0, 0.0, 0))
+        self.assertFalse(np.signbit(amount))
+
+    def test_rising_journal_reports_no_drawdown(self):
+        # Winning trades a few days apart: gaps between new highs are not drawdowns
+        risk = RiskMetrics(day_range(4, step=3), np.array([10.0, 20.0, 5.0, 15.0]), np.full(4, np.nan), 1000)
+        self.assertEqual((risk.max_drawdown, risk.max_drawdown_pct, risk.max_drawdown_days), (0.0, 0.0, 0))
+
+    def test_recovered_dip_lasts_from_peak_to_recovery(self):
+        amount, percent, days = drawdown(day_range(6), np.array([100.0, 110.0, 105.0, 108.0, 112.0, 115.0]))
+        self.assertEqual(amount, 5.0)
+        self.assertAlmostEqual(percent, 5 / 110 * 100)
+        self.assertEqual(days, 3)
+
+    def test_unrecovered_dip_lasts_to_the_last_day(self):
+        amount, percent, days = drawdown(day_range(5), np.array([100.0, 120.0, 125.0, 90.0, 95.0]))
+        self.assertEqual(amount, 35.0)
+        self.assertAlmostEqual(percent, 28.0)
+        self.assertEqual(days, 2)
+
+    def test_longest_of_several_dips(self):
+        equity = np.array([100.0, 90.0, 101.0, 95.0, 96.0, 97.0, 102.0])
+        amount, _, days = drawdown(day_range(7), equity)
+        self.assertEqual(amount, 10.0)
+        self.assertEqual(days, 4)
+
+
+class RiskMetricsTests(SimpleTestCase):
+    def test_streaks(self):
+        pnl = np.array([10.0, 20.0, -5.0, 5.0, 5.0, 5.0, -1.0, -2.0, 0.0, -3.0])
+        risk = RiskMetrics(day_range(pnl.size), pnl, np.full(pnl.size, np.nan), 1000)
+        self.assertEqual(risk.longest_win_streak, 3)
+        self.assertEqual(risk.longest_loss_streak, 2)
+
+    def test_sharpe_and_sortino_undefined_without_variance(self):
+        for value in (0.0, 0.003, 0.1):
+            with self.subTest(value=value):
+                self.assertEqual(sharpe_sortino(np.full(7, value)), (None, None))
+
+    def test_sortino_undefined_without_losing_days(self):
+        sharpe, sortino = sharpe_sortino(np.array([0.01, 0.02, 0.03]))
+        self.assertGreater(sharpe, 0)
+        self.assertIsNone(sortino)
+
+    def test_r_multiples_without_stop_loss(self):
+        pnl = np.array([100.0, -50.0])
+        risk = RiskMetrics(day_range(2), pnl, np.array([np.nan, np.nan]), 1000)
+        self.assertEqual(risk.trades_with_stop, 0)
+        self.assertEqual((risk.avg_r, risk.total_r, risk.best_r, risk.worst_r), (0.0, 0.0, 0.0, 0.0))
+
+    def test_r_multiples_skip_trades_without_stop_loss(self):
+        pnl = np.array([100.0, -50.0, 30.0])
+        risk = RiskMetrics(day_range(3), pnl, np.array([50.0, np.nan, 0.0]), 1000)
+        self.assertEqual(risk.trades_with_stop, 1)
+        self.assertEqual(risk.avg_r, 2.0)
+
+
+BROKER_CSV = """Symbol,Type,Quantity,Entry Price,Exit Price,Entry Date,Exit Date,Stop Loss,Strategy,Notes
+nabil,Buy,10,500,550,2024-01-07 11:00,2024-01-10 14:00,480,Swing Trading,Breakout
+NICA,SELL,20,800,780,2024-01-08,2024-01-09,,,Short
+UPPER,B,100,250.50,,2024-01-11,,,,
+"""
+
+# TMS trade book: serial numbers, Nepali column names and thousands separators
+TMS_CSV = """\ufeffS.N.,Script,Buy/Sell,Kitta,Rate,Business Date
+1,NABIL,Purchase,"1,000","1,250.00",2024/01/07
+2,HIDCL,Sale,50,210.4,2024/01/08
+"""
+
+
+class TradeImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('trader', password='x')
+        self.portfolio = Portfolio.objects.create(user=self.user, initial_capital=Decimal('10000.00'))
+
+    def run_import(self, text, **kwargs):
+        # The balance is recomputed when the import's transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_trades(self.user, io.StringIO(text), **kwargs)
+
+    def test_broker_csv(self):
+        result = self.run_import(BROKER_CSV, batch_size=2)
+        self.assertEqual((result.rows, result.created, result.error_count), (3, 3, 0))
+
+        nabil = Trade.objects.get(symbol='NABIL')
+        self.assertEqual((nabil.trade_type, nabil.status), ('BUY', 'CLOSED'))
+        self.assertEqual(nabil.realized_pnl, Decimal('500.00'))
+        self.assertEqual(nabil.stop_loss, Decimal('480.00'))
+        self.assertEqual(nabil.strategy.name, 'Swing Trading')
+        self.assertEqual(Trade.objects.get(symbol='NICA').realized_pnl, Decimal('400.00'))
+        upper = Trade.objects.get(symbol='UPPER')
+        self.assertEqual((upper.status, upper.realized_pnl), ('OPEN', None))
+
+    def test_tms_trade_book(self):
+        result = self.run_import(TMS_CSV.lstrip('\ufeff'))
+        self.assertEqual((result.created, result.error_count), (2, 0))
+        nabil = Trade.objects.get(symbol='NABIL')
+        self.assertEqual((nabil.trade_type, nabil.quantity, nabil.entry_price), ('BUY', 1000, Decimal('1250.00')))
+        self.assertEqual(Trade.objects.get(symbol='HIDCL').trade_type, 'SELL')
+
+    def test_tms_upload_with_byte_order_mark(self):
+        upload = SimpleUploadedFile('tradebook.csv', TMS_CSV.encode('utf-8'))
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_trades_from_upload(self.user, upload)
+        self.assertEqual((result.created, result.error_count), (2, 0))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        text = (
+            "Symbol,Type,Quantity,Entry Price,Entry Date\n"
+            "NABIL,BUY,10,abc,2024-01-07\n"
+            "NABIL,BUY,10,inf,2024-01-07\n"
+            "NABIL,BUY,10,1e400,2024-01-07\n"
+            "NABIL,BUY,10,nan,2024-01-07\n"
+            "NABIL,BUY,10,123456789,2024-01-07\n"
+            "NABIL,BUY,1e400,500,2024-01-07\n"
+            "NABIL,BUY,10.5,500,2024-01-07\n"
+            "NABIL,HOLD,10,500,2024-01-07\n"
+            "NABIL,BUY,10,500,yesterday\n"
+            "NABIL,BUY,10,500,2024-01-07\n"
+        )
+        result = self.run_import(text)
+        self.assertEqual((result.rows, result.created, result.error_count), (10, 1, 9))
+        self.assertEqual([line for line, _ in result.errors], list(range(2, 11)))
+        self.assertEqual(result.errors[1], (3, "'inf' is not a number"))
+        self.assertEqual(result.errors[4], (6, "'123456789' is too large"))
+        self.assertEqual(Trade.objects.count(), 1)
+
+    def test_missing_columns(self):
+        result = self.run_import("Symbol,Quantity\nNABIL,10\n")
+        self.assertEqual(result.created, 0)
+        self.assertIn('trade_type', result.errors[0][1])
+
+    def test_non_utf8_upload_is_rejected_before_importing(self):
+        upload = SimpleUploadedFile('trades.csv', 'Symbol,Type,Quantity,Entry Price,Entry Date\nNÄBIL,BUY,1,1,2024-01-07\n'.encode('latin-1'))
+        with self.assertRaisesMessage(ValueError, 'not UTF-8'):
+            import_trades_from_upload(self.user, upload)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_non_utf8_upload_is_a_form_error(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('trades.csv', 'Symbol\nNÄBIL\n'.encode('latin-1'))
+        response = self.client.post(reverse('journal:trade_import'), {'csv_file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not UTF-8', str(response.context['form'].errors['csv_file']))
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import(BROKER_CSV, dry_run=True)
+        self.assertEqual(result.created, 3)
+        self.assertFalse(Trade.objects.exists())
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.current_balance, Decimal('10000.00'))
+
+    def test_portfolio_balance_and_snapshots_after_import(self):
+        self.run_import(BROKER_CSV, batch_size=1)
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.current_balance, Decimal('10900.00'))
+        self.assertEqual(
+            list(DailySnapshot.objects.filter(portfolio=self.portfolio).values_list('realized_pnl', 'trade_count')),
+            [(Decimal('400.00'), 1), (Decimal('500.00'), 1)],
+        )
+
+
+class ImportTradesCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('trader', password='x')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def csv_file(self, data):
+        path = os.path.join(self.directory.name, 'trades.csv')
+        with open(path, 'wb') as output:
+            output.write(data)
+        return path
+
+    def call(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_trades', 'trader', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import(self):
+        stdout, _ = self.call(self.csv_file(BROKER_CSV.encode()), '--batch-size', '2')
+        self.assertIn('Imported 3 of 3 rows (0 errors)', stdout)
+        self.assertEqual(Trade.objects.filter(user=self.user).count(), 3)
+
+    def test_dry_run_writes_nothing(self):
+        stdout, _ = self.call(self.csv_file(BROKER_CSV.encode()), '--dry-run')
+        self.assertIn('Validated 3 of 3 rows', stdout)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_bad_rows_are_listed(self):
+        path = self.csv_file(b"Symbol,Type,Quantity,Entry Price,Entry Date\nNABIL,BUY,10,inf,2024-01-07\n")
+        stdout, stderr = self.call(path)
+        self.assertIn("Line 2: 'inf' is not a number", stderr)
+        self.assertIn('Imported 0 of 1 rows (1 errors)', stdout)
+
+    def test_non_utf8_file(self):
+        path = self.csv_file('Symbol\nNÄBIL\n'.encode('latin-1'))
+        with self.assertRaisesMessage(CommandError, 'not UTF-8'):
+            self.call(path)
+
+
+def cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode('latin-1')).decode().rstrip('=')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('trader', password='x')
+        start = timezone.now().replace(microsecond=0)
+        # Four trades share an entry date, so pages split inside a tie
+        entry_dates = [start] * 4 + [start - timedelta(days=day) for day in range(1, 5)]
+        Trade.objects.bulk_create([
+            Trade(user=self.user, symbol='NABIL', trade_type='BUY', quantity=1,
+                  entry_price=Decimal('100.00'), entry_date=entry_date)
+            for entry_date in entry_dates
+        ])
+        self.trades = Trade.objects.filter(user=self.user)
+        self.expected = list(self.trades.order_by('-entry_date', '-pk'))
+
+    def test_forward_and_back_across_tied_entry_dates(self):
+        pages = [keyset_paginate(self.trades, page_size=3)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(self.trades, after=pages[-1].next_cursor, page_size=3))
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual([trade for page in pages for trade in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        # Walking back from the last page returns the same pages
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = keyset_paginate(self.trades, before=page.previous_cursor, page_size=3)
+            self.assertEqual(page.items, expected.items)
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+
+    def test_cursor_round_trip(self):
+        trade = self.expected[0]
+        self.assertEqual(decode_cursor(encode_cursor(trade)), (trade.entry_date, trade.pk))
+
+    def test_tampered_cursors_are_ignored(self):
+        tampered = [
+            '!!!', 'abc', cursor('\xff\xfe|1'), cursor('2024-01-07T10:00:00+00:00|x'),
+            cursor('not a date|1'), cursor('no separator'),
+            # Naive timestamps are never written, and would compare in the wrong zone
+            cursor('2024-01-07T10:00:00|1'),
+        ]
+        for value in tampered:
+            with self.subTest(cursor=value):
+                self.assertIsNone(decode_cursor(value))
+                self.assertEqual(keyset_paginate(self.trades, after=value, page_size=3).items, self.expected[:3])
+
+    def test_tampered_cursor_on_the_trade_list(self):
+        self.client.force_login(self.user)
+        for parameter in ('after', 'before'):
+            response = self.client.get(reverse('journal:trade_list'), {parameter: cursor('\xff|1')})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['trades']), len(self.expected))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TradeListTotalsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('trader', password='x')
+        self.client.force_login(self.user)
+
+    def add_trade(self, **fields):
+        fields = {'symbol': 'NABIL', 'trade_type': 'BUY', 'quantity': 1, 'entry_price': Decimal('100.00'), **fields}
+        return Trade.objects.create(user=self.user, **fields)
+
+    def totals(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('journal:trade_list'), params)
+        counted = any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        return response.context['total_trades'], response.context['open_trades'], counted
+
+    def test_totals_are_cached_and_invalidated_by_new_trades(self):
+        self.add_trade()
+        self.add_trade(status='CLOSED', exit_price=Decimal('110.00'))
+        self.assertEqual(self.totals(), (2, 1, True))
+        self.assertEqual(self.totals(), (2, 1, False))
+
+        self.add_trade()
+        self.assertEqual(self.totals(), (3, 2, True))
+
+    def test_totals_are_cached_per_filter(self):
+        self.add_trade(symbol='NICA')
+        self.add_trade()
+        self.assertEqual(self.totals(), (2, 2, True))
+        self.assertEqual(self.totals(symbol='NICA'), (1, 1, True))
+        self.assertEqual(self.totals(symbol='NICA'), (1, 1, False))
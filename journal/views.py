@@ -1,18 +1,50 @@
+import hashlib
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count, Q
 from .models import Trade, TradeImage, Strategy
-from .forms import TradeForm, TradeImageForm, StrategyForm
+from .forms import TradeForm, TradeImageForm, StrategyForm, TradeImportForm, TradeFilterForm
+from .importers import import_trades_from_upload
+from .pagination import keyset_paginate
+from .analytics import analyze_trades
+from core.cache import cached_for_user
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
-from decimal import Decimal
 
 @login_required
 def trade_list(request):
-    trades = Trade.objects.filter(user=request.user).order_by('-entry_date')
-    return render(request, 'journal/trade_list.html', {'trades': trades})
+    filter_form = TradeFilterForm(request.user, request.GET or None)
+    trades = filter_form.filter(Trade.objects.filter(user=request.user))
+    page = keyset_paginate(
+        trades.select_related('strategy'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    
+    # Keep the active filters in the pagination links
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    
+    # The totals only change with the filters or the user's trades, so paging
+    # through the list reuses them instead of counting every row again
+    filters = hashlib.sha256(query.urlencode().encode()).hexdigest()
+    counts = cached_for_user(request.user.pk, f'trade-counts:{filters}', lambda: trades.aggregate(
+        total=Count('pk'),
+        open=Count('pk', filter=Q(status='OPEN')),
+    ))
+    
+    return render(request, 'journal/trade_list.html', {
+        'trades': page,
+        'filter_form': filter_form,
+        'filter_query': query.urlencode(),
+        'total_trades': counts['total'],
+        'open_trades': counts['open'],
+    })
 
 @login_required
 def trade_create(request):
@@ -23,11 +55,34 @@ def trade_create(request):
             trade.user = request.user
             trade.save()
             messages.success(request, 'Trade logged successfully!')
-            return redirect('trade_list')
+            return redirect('journal:trade_list')
     else:
         form = TradeForm(request.user)
     return render(request, 'journal/trade_form.html', {'form': form, 'title': 'Log New Trade'})
 
+@login_required
+def trade_import(request):
+    result = None
+    if request.method == 'POST':
+        form = TradeImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_trades_from_upload(
+                    request.user, form.cleaned_data['csv_file'], dry_run=form.cleaned_data['dry_run']
+                )
+            except ValueError as e:
+                form.add_error('csv_file', str(e))
+        if result is not None:
+            if form.cleaned_data['dry_run']:
+                messages.info(request, f'{result.created} of {result.rows} rows are valid. Nothing was saved.')
+            elif result.created:
+                messages.success(request, f'Imported {result.created} of {result.rows} trades.')
+            if result.error_count:
+                messages.warning(request, f'{result.error_count} rows were skipped because of errors.')
+    else:
+        form = TradeImportForm()
+    return render(request, 'journal/trade_import.html', {'form': form, 'result': result})
+
 @login_required
 def trade_detail(request, pk):
     trade = get_object_or_404(Trade, pk=pk, user=request.user)
@@ -41,7 +96,7 @@ def trade_update(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, 'Trade updated successfully!')
-            return redirect('trade_detail', pk=pk)
+            return redirect('journal:trade_detail', pk=pk)
     else:
         form = TradeForm(request.user, instance=trade)
     return render(request, 'journal/trade_form.html', {'form': form, 'title': 'Update Trade'})
@@ -52,7 +107,7 @@ def trade_delete(request, pk):
     if request.method == 'POST':
         trade.delete()
         messages.success(request, 'Trade deleted successfully!')
-        return redirect('trade_list')
+        return redirect('journal:trade_list')
     return render(request, 'journal/trade_confirm_delete.html', {'trade': trade})
 
 @login_required
@@ -69,7 +124,7 @@ def strategy_create(request):
             strategy.user = request.user
             strategy.save()
             messages.success(request, 'Strategy created successfully!')
-            return redirect('strategy_list')
+            return redirect('journal:strategy_list')
     else:
         form = StrategyForm()
     return render(request, 'journal/strategy_form.html', {'form': form, 'title': 'Create New Strategy'})
@@ -80,27 +135,19 @@ def generate_trade_report(request):
     """
     Generates a PDF report of the user's trading performance.
     """
-    # Fetch closed trades for the user
-    closed_trades = Trade.objects.filter(user=request.user, status='CLOSED').order_by('exit_date')
-
-    pnl_values = [t.pnl for t in closed_trades if t.pnl is not None]
-
-    total_trades = len(pnl_values)
-    wins = [pnl for pnl in pnl_values if pnl > 0]
-    losses = [pnl for pnl in pnl_values if pnl <= 0]
-
-    winning_trades = len(wins)
-    losing_trades = len(losses)
-
-    win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    analytics = analyze_trades(request.user)
 
-    total_pnl = sum(pnl_values) if pnl_values else Decimal('0.00')
+    total_trades = analytics.total_closed
+    winning_trades = analytics.winning_trades
+    losing_trades = analytics.losing_trades
+    win_rate = analytics.win_rate
+    total_pnl = analytics.total_pnl
 
-    average_win = sum(wins) / len(wins) if wins else Decimal('0.00')
-    average_loss = sum(losses) / len(losses) if losses else Decimal('0.00')
+    average_win = analytics.avg_win
+    average_loss = -analytics.avg_loss
     
-    largest_win = max(wins) if wins else Decimal('0.00')
-    largest_loss = min(losses) if losses else Decimal('0.00')
+    largest_win = analytics.largest_win
+    largest_loss = analytics.largest_loss
 
     # Create the HttpResponse object with the appropriate PDF headers.
     response = HttpResponse(content_type='application/pdf')
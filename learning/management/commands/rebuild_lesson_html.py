@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from core.parallel import map_chunks, pk_chunks
+from learning.models import Lesson
+
+
+def render_range(first_pk, last_pk, force=False):
+    """Re-render the lessons whose pk lies in [first_pk, last_pk]; returns (checked, rendered)"""
+    lessons = list(Lesson.objects.filter(pk__gte=first_pk, pk__lte=last_pk).only('pk', 'content', 'content_hash'))
+    changed = [lesson for lesson in lessons if lesson.render_content(force=force)]
+    Lesson.objects.bulk_update(changed, ['content_html', 'content_hash'])
+    return len(lessons), len(changed)
+
+
+class Command(BaseCommand):
+    help = 'Re-render the cached HTML of lessons whose Markdown content or configuration changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render every lesson, even if its hash is current')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Lessons rendered per batch (default: 200)')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
+
+    def handle(self, *args, **options):
+        chunks = pk_chunks(Lesson.objects.all(), options['chunk_size'])
+
+        self.stdout.write(self.style.WARNING(f'Rendering {sum(chunk.size for chunk in chunks)} lessons...'))
+
+        def on_progress(done, total):
+            self.stdout.write(f'Progress: {done}/{total}')
+
+        count = 0
+        rendered = 0
+        for checked, changed in map_chunks(
+            render_range, chunks, options['force'],
+            workers=options['workers'], on_progress=on_progress if options['verbosity'] > 0 else None,
+        ):
+            count += checked
+            rendered += changed
+
+        self.stdout.write(self.style.SUCCESS(f'Checked {count} lessons, {rendered} re-rendered'))
@@ -1,5 +1,13 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.safestring import mark_safe
+
+from .outline import invalidate_course_outline
+from .rendering import content_hash, render_markdown
 
 class Course(models.Model):
     title = models.CharField(max_length=200)
@@ -25,14 +33,43 @@ class Lesson(models.Model):
     external_link = models.URLField(blank=True, null=True, help_text="External Resource Link")
     order = models.PositiveIntegerField(default=0)
     duration_minutes = models.PositiveIntegerField(default=10, help_text="Estimated duration in minutes")
+    # Cached Markdown rendering of content, valid while content_hash matches
+    content_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['course', 'order', 'id'], name='lesson_course_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        if self.render_content():
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'content_hash'}
+        super().save(*args, **kwargs)
+
+    def render_content(self, force=False):
+        """Re-render content_html if the content changed; returns True if it did"""
+        digest = content_hash(self.content)
+        if not force and digest == self.content_hash:
+            return False
+        self.content_html = render_markdown(self.content)
+        self.content_hash = digest
+        return True
+
+    @property
+    def rendered_content(self):
+        """Content as HTML, rendered on the fly only if the stored copy is stale"""
+        if self.content_hash != content_hash(self.content):
+            return mark_safe(render_markdown(self.content))
+        return mark_safe(self.content_html)
+
 class UserCourseProgress(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='course_progress')
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
@@ -44,3 +81,41 @@ class UserCourseProgress(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.lesson.title}"
+
+
+# Drop the cached outline of a course whenever one of its lessons changes
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_course(sender, instance, **kwargs):
+    instance._previous_course_id = None
+    if instance.pk:
+        instance._previous_course_id = Lesson.objects.filter(pk=instance.pk).values_list(
+            'course_id', flat=True
+        ).first()
+
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_lesson_outline(sender, instance, **kwargs):
+    invalidate_course_outline(instance.course_id)
+    previous_course_id = getattr(instance, '_previous_course_id', None)
+    if previous_course_id and previous_course_id != instance.course_id:
+        invalidate_course_outline(previous_course_id)
+
+
+def annotate_course_progress(queryset, user):
+    """
+    Annotate courses with ``lesson_count``, ``total_duration`` (minutes) and
+    ``completed_count`` for user, computed in a single grouped query.
+    """
+    completed = UserCourseProgress.objects.filter(
+        user=user, completed=True, lesson__course=OuterRef('pk')
+    ).order_by().values('lesson__course').annotate(count=Count('pk')).values('count')
+    return queryset.annotate(
+        lesson_count=Count('lessons', distinct=True),
+        total_duration=Coalesce(Sum('lessons__duration_minutes'), Value(0)),
+        completed_count=Coalesce(Subquery(completed, output_field=IntegerField()), Value(0)),
+    )
+
+
+def format_duration(minutes):
+    """Format a number of minutes as '1h 30m' or '45m'"""
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
@@ -0,0 +1,68 @@
+"""
+Cached course outlines.
+
+An outline is the ordered list of a course's lessons (id, title, order, type
+and duration) with previous/next pointers, so the course page and lesson
+navigation never query the lesson table for it. Outlines are cached without
+expiry and dropped by the Lesson signals in learning.models whenever a lesson
+of the course is saved or deleted.
+"""
+from django.core.cache import cache
+
+OUTLINE_FIELDS = ('pk', 'title', 'order', 'content_type', 'duration_minutes')
+
+
+def _outline_key(course_id):
+    return f'course-outline:{course_id}'
+
+
+class CourseOutline:
+    """Ordered lessons of a course with neighbour lookups by lesson id"""
+
+    def __init__(self, lessons):
+        self.lessons = lessons
+        self.positions = {lesson['pk']: index for index, lesson in enumerate(lessons)}
+
+    def __len__(self):
+        return len(self.lessons)
+
+    @property
+    def total_duration(self):
+        return sum(lesson['duration_minutes'] or 0 for lesson in self.lessons)
+
+    def neighbours(self, lesson_id):
+        """Return the (previous, next) lesson entries of a lesson, None at either end"""
+        index = self.positions.get(lesson_id)
+        if index is None:
+            return None, None
+        entry = self.lessons[index]
+        prev_lesson = self.lessons[entry['prev']] if entry['prev'] is not None else None
+        next_lesson = self.lessons[entry['next']] if entry['next'] is not None else None
+        return prev_lesson, next_lesson
+
+
+def build_course_outline(course_id):
+    from .models import Lesson
+
+    lessons = list(
+        Lesson.objects.filter(course_id=course_id).order_by('order', 'pk').values(*OUTLINE_FIELDS)
+    )
+    last = len(lessons) - 1
+    for index, lesson in enumerate(lessons):
+        lesson['prev'] = index - 1 if index > 0 else None
+        lesson['next'] = index + 1 if index < last else None
+    return lessons
+
+
+def get_course_outline(course_id):
+    """Return the CourseOutline of a course, building and caching it on a miss"""
+    key = _outline_key(course_id)
+    lessons = cache.get(key)
+    if lessons is None:
+        lessons = build_course_outline(course_id)
+        cache.set(key, lessons, None)
+    return CourseOutline(lessons)
+
+
+def invalidate_course_outline(course_id):
+    cache.delete(_outline_key(course_id))
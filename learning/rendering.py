@@ -0,0 +1,35 @@
+"""
+Markdown rendering for lesson content.
+
+Lessons store their rendered HTML next to a hash of the source text and the
+Markdown configuration, so pages never re-run Markdown on a request. The HTML
+is regenerated when a lesson is saved with new content, or by the
+rebuild_lesson_html command after MARKDOWN_EXTENSIONS changes.
+"""
+import hashlib
+import json
+
+import markdown
+
+MARKDOWN_EXTENSIONS = []
+MARKDOWN_EXTENSION_CONFIGS = {}
+
+# Part of every content hash, so changing the configuration invalidates all HTML
+_CONFIG_KEY = json.dumps(
+    [markdown.__version__, MARKDOWN_EXTENSIONS, MARKDOWN_EXTENSION_CONFIGS], sort_keys=True
+)
+
+
+def render_markdown(text):
+    if not text:
+        return ''
+    return markdown.markdown(
+        text, extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    )
+
+
+def content_hash(text):
+    """SHA-256 of the Markdown source and the rendering configuration"""
+    digest = hashlib.sha256(_CONFIG_KEY.encode())
+    digest.update((text or '').encode())
+    return digest.hexdigest()
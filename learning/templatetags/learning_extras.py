@@ -1,14 +1,15 @@
 from django import template
-import markdown
 from django.utils.safestring import mark_safe
 
+from learning.rendering import render_markdown
+
 register = template.Library()
 
 @register.filter(name='markdown')
 def markdown_format(text):
     if not text:
         return ""
-    return mark_safe(markdown.markdown(text))
+    return mark_safe(render_markdown(text))
 
 @register.filter
 def youtube_embed(url):
@@ -1,49 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Count, Q, Avg
-from .models import Course, Lesson, UserCourseProgress
+from django.db.models import Q, Avg
+from .models import Course, Lesson, UserCourseProgress, annotate_course_progress, format_duration
+from .outline import get_course_outline
 
 @login_required
 def course_list(request):
-    courses = Course.objects.annotate(
-        lesson_count=Count('lessons'),
-        total_duration=Count('lessons__duration_minutes')
-    ).all()
+    courses = annotate_course_progress(Course.objects.all(), request.user)
     
-    # Calculate progress for each course
+    # Calculate progress for each course from the annotated totals
     courses_with_progress = []
     for course in courses:
-        completed_lessons = UserCourseProgress.objects.filter(
-            user=request.user,
-            lesson__course=course,
-            completed=True
-        ).count()
-        
-        total_lessons = course.lessons.count()
+        total_lessons = course.lesson_count
+        completed_lessons = course.completed_count
         progress_percent = 0
         if total_lessons > 0:
             progress_percent = round((completed_lessons / total_lessons) * 100)
         
-        # Calculate total duration
-        total_duration = sum([lesson.duration_minutes or 0 for lesson in course.lessons.all()])
-        hours = total_duration // 60
-        minutes = total_duration % 60
-        duration_str = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
-        
         courses_with_progress.append({
             'course': course,
             'progress_percent': progress_percent,
             'total_lessons': total_lessons,
             'completed_lessons': completed_lessons,
-            'duration_str': duration_str,
-            'total_duration': total_duration
+            'duration_str': format_duration(course.total_duration),
+            'total_duration': course.total_duration
         })
     
     # Overall stats
-    total_courses = courses.count()
-    total_lessons_all = Lesson.objects.count()
-    completed_all = UserCourseProgress.objects.filter(user=request.user, completed=True).count()
+    total_courses = len(courses_with_progress)
+    total_lessons_all = sum(data['total_lessons'] for data in courses_with_progress)
+    completed_all = sum(data['completed_lessons'] for data in courses_with_progress)
     overall_progress = 0
     if total_lessons_all > 0:
         overall_progress = round((completed_all / total_lessons_all) * 100)
@@ -60,30 +47,30 @@ def course_list(request):
 @login_required
 def course_detail(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    lessons = course.lessons.all()
+    outline = get_course_outline(course.pk)
     
     # Calculate progress
-    completed_lessons = UserCourseProgress.objects.filter(
+    completed_lessons = set(UserCourseProgress.objects.filter(
         user=request.user, 
         lesson__course=course, 
         completed=True
-    ).values_list('lesson_id', flat=True)
+    ).values_list('lesson_id', flat=True))
     
     progress_percent = 0
-    if lessons.count() > 0:
-        progress_percent = (len(completed_lessons) / lessons.count()) * 100
+    if len(outline) > 0:
+        progress_percent = (len(completed_lessons) / len(outline)) * 100
         
     return render(request, 'learning/course_detail.html', {
         'course': course,
-        'lessons': lessons,
+        'lessons': outline.lessons,
         'completed_lessons': completed_lessons,
         'progress_percent': round(progress_percent),
     })
 
 @login_required
 def lesson_detail(request, course_pk, lesson_pk):
-    course = get_object_or_404(Course, pk=course_pk)
-    lesson = get_object_or_404(Lesson, pk=lesson_pk, course=course)
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), pk=lesson_pk, course_id=course_pk)
+    course = lesson.course
     
     # Mark as completed
     UserCourseProgress.objects.get_or_create(
@@ -92,19 +79,14 @@ def lesson_detail(request, course_pk, lesson_pk):
         defaults={'completed': True, 'completed_at': timezone.now()}
     )
     
-    # Get next lesson
-    next_lesson = course.lessons.filter(order__gt=lesson.order).order_by('order').first()
-    prev_lesson = course.lessons.filter(order__lt=lesson.order).order_by('-order').first()
-    
-    # If no lesson found by order (e.g. same order), try by ID as fallback
-    if not next_lesson:
-        next_lesson = course.lessons.filter(order=lesson.order, pk__gt=lesson.pk).order_by('pk').first()
-    if not prev_lesson:
-        prev_lesson = course.lessons.filter(order=lesson.order, pk__lt=lesson.pk).order_by('-pk').first()
+    # Sidebar and previous/next navigation come from the cached outline
+    outline = get_course_outline(course.pk)
+    prev_lesson, next_lesson = outline.neighbours(lesson.pk)
     
     return render(request, 'learning/lesson_detail.html', {
         'course': course,
         'lesson': lesson,
+        'outline_lessons': outline.lessons,
         'next_lesson': next_lesson,
         'prev_lesson': prev_lesson,
     })
@@ -122,18 +104,18 @@ class CourseCreateView(SuperUserRequiredMixin, CreateView):
     model = Course
     fields = ['title', 'description', 'thumbnail']
     template_name = 'learning/course_form.html'
-    success_url = reverse_lazy('course_list')
+    success_url = reverse_lazy('learning:course_list')
 
 class CourseUpdateView(SuperUserRequiredMixin, UpdateView):
     model = Course
     fields = ['title', 'description', 'thumbnail']
     template_name = 'learning/course_form.html'
-    success_url = reverse_lazy('course_list')
+    success_url = reverse_lazy('learning:course_list')
 
 class CourseDeleteView(SuperUserRequiredMixin, DeleteView):
     model = Course
     template_name = 'learning/course_confirm_delete.html'
-    success_url = reverse_lazy('course_list')
+    success_url = reverse_lazy('learning:course_list')
 
 class LessonCreateView(SuperUserRequiredMixin, CreateView):
     model = Lesson
@@ -153,7 +135,7 @@ class LessonCreateView(SuperUserRequiredMixin, CreateView):
         return context
 
     def get_success_url(self):
-        return reverse_lazy('course_detail', kwargs={'pk': self.object.course.pk})
+        return reverse_lazy('learning:course_detail', kwargs={'pk': self.object.course.pk})
 
 class LessonUpdateView(SuperUserRequiredMixin, UpdateView):
     model = Lesson
@@ -161,11 +143,11 @@ class LessonUpdateView(SuperUserRequiredMixin, UpdateView):
     template_name = 'learning/lesson_form.html'
     
     def get_success_url(self):
-        return reverse_lazy('course_detail', kwargs={'pk': self.object.course.pk})
+        return reverse_lazy('learning:course_detail', kwargs={'pk': self.object.course.pk})
 
 class LessonDeleteView(SuperUserRequiredMixin, DeleteView):
     model = Lesson
     template_name = 'learning/lesson_confirm_delete.html'
     
     def get_success_url(self):
-        return reverse_lazy('course_detail', kwargs={'pk': self.object.course.pk})
+        return reverse_lazy('learning:course_detail', kwargs={'pk': self.object.course.pk})
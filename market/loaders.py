@@ -0,0 +1,135 @@
+"""
+Bulk loading of daily price CSVs into the price store.
+
+Accepts per-symbol histories (one file per scrip, the symbol taken from a
+column or the file name) as well as NEPSE "today's price" exports with one
+row per symbol and day. Rows are parsed with the csv module, collected per
+symbol and written to the store once per load, so a load of many files
+replaces every touched symbol's files exactly once.
+"""
+import csv
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from core.csv_utils import CSVResult, map_columns, parse_datetime, parse_decimal
+from .store import COLUMNS, normalize_symbol, price_store
+
+# Accepted header names (lower-cased) for each price column
+COLUMN_ALIASES = {
+    'symbol': ('symbol', 'stock symbol', 'scrip', 'stock', 'script', 'ticker'),
+    'date': ('date', 'business date', 'businessdate', 'trade date', 'as of date', 'published date'),
+    'open': ('open', 'open price', 'opening price'),
+    'high': ('high', 'high price', 'max price'),
+    'low': ('low', 'low price', 'min price'),
+    'close': ('close', 'close price', 'closing price', 'ltp', 'last traded price'),
+    'volume': ('volume', 'vol', 'total traded quantity', 'traded quantity', 'qty'),
+}
+
+REQUIRED_COLUMNS = ('date', 'close')
+
+
+class LoadResult(CSVResult):
+    """Outcome of a load: files and rows read, rows stored per symbol and errors as (source, line, message)"""
+
+    def __init__(self, max_errors=1000):
+        super().__init__(max_errors=max_errors)
+        self.files = 0
+        self.symbols = {}
+
+
+def parse_number(value):
+    number = parse_decimal(value, decimal_places=None)
+    return None if number is None else float(number)
+
+
+def parse_date(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError('Date is required')
+    return moment.date()
+
+
+def read_price_csv(stream, source, collected, result, symbol=None):
+    """
+    Parse one CSV into collected (symbol -> list of (date, o, h, l, c, v)).
+    symbol is used for files without a symbol column.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        result.add_error(source, 1, 'The file is empty')
+        return
+    try:
+        mapping = map_columns(header, COLUMN_ALIASES, REQUIRED_COLUMNS)
+    except ValueError as e:
+        result.add_error(source, 1, str(e))
+        return
+    if 'symbol' not in mapping and not symbol:
+        result.add_error(source, 1, 'No symbol column and no symbol given')
+        return
+
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        result.rows += 1
+        try:
+            row_symbol = normalize_symbol(row[mapping['symbol']]) if 'symbol' in mapping else symbol
+            day = parse_date(row[mapping['date']])
+            close = parse_number(row[mapping['close']])
+            if not row_symbol or close is None:
+                raise ValueError('Symbol and close price are required')
+            # Missing open/high/low fall back to the close, missing volume to 0
+            values = [
+                parse_number(row[mapping[column]]) if column in mapping else None
+                for column in COLUMNS
+            ]
+            values = [
+                value if value is not None else (0.0 if column == 'volume' else close)
+                for column, value in zip(COLUMNS, values)
+            ]
+        except (ValueError, IndexError) as e:
+            result.add_error(source, reader.line_num, str(e) if isinstance(e, ValueError) else 'Too few columns')
+            continue
+        collected[row_symbol].append((day, *values))
+
+
+def load_price_files(paths, symbol=None, store=None, dry_run=False, on_file=None, max_errors=1000):
+    """
+    Load daily price CSVs (files, or directories of *.csv files) into the store.
+
+    symbol is used for files without a symbol column; when it is not given
+    such a file's name (NABIL.csv) is the symbol. With dry_run the files are
+    only validated. on_file(done, total) is called after every file.
+    """
+    store = store or price_store
+    result = LoadResult(max_errors=max_errors)
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob('*.csv')) if path.is_dir() else [path])
+
+    collected = defaultdict(list)
+    for done, path in enumerate(files, 1):
+        # Rows of a file are kept only once all of it has decoded
+        rows = defaultdict(list)
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                read_price_csv(stream, str(path), rows, result, symbol=symbol or normalize_symbol(path.stem))
+        except UnicodeDecodeError:
+            result.add_error(str(path), 1, 'The file is not UTF-8 text')
+        else:
+            for row_symbol, symbol_rows in rows.items():
+                collected[row_symbol].extend(symbol_rows)
+        result.files += 1
+        if on_file:
+            on_file(done, len(files))
+
+    prices = {}
+    for row_symbol, rows in collected.items():
+        days, *values = zip(*rows)
+        prices[row_symbol] = (np.array(days, dtype='datetime64[D]'), np.array(values, dtype=float))
+        result.symbols[row_symbol] = len(rows)
+    if prices and not dry_run:
+        store.write(prices)
+    return result
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from market.loaders import load_price_files
+from market.store import price_store
+
+
+class Command(BaseCommand):
+    help = 'Bulk load daily NEPSE price CSVs into the local price store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV files, or directories of CSV files')
+        parser.add_argument('--symbol', help='Symbol of files without a symbol column (default: the file name)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the files without storing any prices')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f'Loading prices into {price_store.root}...'))
+
+        def on_file(done, total):
+            self.stdout.write(f'Progress: {done}/{total}')
+
+        try:
+            result = load_price_files(
+                options['paths'], symbol=options['symbol'], dry_run=options['dry_run'], on_file=on_file
+            )
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        for source, line, message in result.errors:
+            self.stderr.write(f'{source}:{line}: {message}')
+        if result.truncated_errors:
+            self.stderr.write(f'... and {result.truncated_errors} more errors')
+
+        verb = 'Validated' if options['dry_run'] else 'Loaded'
+        stored = sum(result.symbols.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {stored} of {result.rows} rows for {len(result.symbols)} symbols '
+            f'from {result.files} files ({result.error_count} errors)'
+        ))
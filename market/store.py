@@ -0,0 +1,200 @@
+"""
+Local end-of-day price store for NEPSE symbols.
+
+Every symbol is kept as two .npy files under PRICE_STORE_ROOT: a sorted
+datetime64[D] date index and a (5, n) float array holding the open, high,
+low, close and volume columns, each contiguous. Files are opened as read-only
+memory maps, so lookups binary-search the date index and range queries return
+views into the mapped files without copying or loading whole histories.
+
+Files are never modified in place. A load writes new files for the symbols it
+touches and then atomically replaces manifest.json, which names the current
+files of every symbol, so readers always see a consistent snapshot. The
+manifest's version changes on every load; caches of values derived from
+prices key on it.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+MANIFEST = 'manifest.json'
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+CLOSE = COLUMNS.index('close')
+
+
+def normalize_symbol(symbol):
+    return symbol.strip().upper()
+
+
+class PriceSeries:
+    """Dates and OHLCV columns of one symbol, usually views of memory-mapped files"""
+
+    def __init__(self, symbol, dates, ohlcv):
+        self.symbol = symbol
+        self.dates = dates
+        self.ohlcv = ohlcv
+
+    def __len__(self):
+        return self.dates.size
+
+    def __getattr__(self, name):
+        # series.open, series.close, ... are rows of the OHLCV array
+        if name in COLUMNS:
+            return self.ohlcv[COLUMNS.index(name)]
+        raise AttributeError(name)
+
+    def between(self, start=None, end=None):
+        """The rows dated start..end inclusive (either bound may be None), without copying"""
+        first = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left'))
+        last = self.dates.size if end is None else int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right'))
+        return PriceSeries(self.symbol, self.dates[first:last], self.ohlcv[:, first:last])
+
+    def close_on(self, day):
+        """Close on day, or on the last trading day before it; None before the first"""
+        index = int(np.searchsorted(self.dates, np.datetime64(day, 'D'), side='right')) - 1
+        return float(self.ohlcv[CLOSE, index]) if index >= 0 else None
+
+
+class PriceStore:
+    """Read and write access to the price files under a root directory"""
+
+    def __init__(self, root=None):
+        self._root = root
+        self._manifest = None
+        self._manifest_mtime = None
+        self._maps = {}
+
+    @property
+    def root(self):
+        return Path(self._root or settings.PRICE_STORE_ROOT)
+
+    @property
+    def manifest(self):
+        """The current manifest, re-read whenever another process has replaced it"""
+        path = self.root / MANIFEST
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {'version': None, 'symbols': {}}
+        if mtime != self._manifest_mtime:
+            self._manifest = json.loads(path.read_text())
+            self._manifest_mtime = mtime
+            # Unmap the files of earlier loads
+            current = {name for entry in self._manifest['symbols'].values() for name in (entry['dates'], entry['ohlcv'])}
+            self._maps = {name: mapped for name, mapped in self._maps.items() if name in current}
+        return self._manifest
+
+    @property
+    def version(self):
+        """Changes every time prices are loaded; None while the store is empty"""
+        return self.manifest['version']
+
+    def symbols(self):
+        return sorted(self.manifest['symbols'])
+
+    def __contains__(self, symbol):
+        return normalize_symbol(symbol) in self.manifest['symbols']
+
+    def _open(self, name):
+        # Price files are immutable, so a mapping can be reused for as long as
+        # the manifest names it
+        if name not in self._maps:
+            self._maps[name] = np.load(self.root / name, mmap_mode='r')
+        return self._maps[name]
+
+    def series(self, symbol):
+        """The full PriceSeries of a symbol; raises KeyError for unknown symbols"""
+        symbol = normalize_symbol(symbol)
+        entry = self.manifest['symbols'][symbol]
+        return PriceSeries(symbol, self._open(entry['dates']), self._open(entry['ohlcv']))
+
+    def range(self, symbol, start=None, end=None):
+        """The rows of a symbol dated start..end inclusive, as views of the mapped files"""
+        return self.series(symbol).between(start, end)
+
+    def close(self, symbol, day):
+        """
+        Close of symbol on day, or on the last trading day before it (markets are
+        shut on Fridays, Saturdays and holidays). None when there is no price.
+        """
+        if symbol not in self:
+            return None
+        return self.series(symbol).close_on(day)
+
+    def latest_closes(self, symbols):
+        """
+        The last stored close and its date for each of symbols, as two arrays in
+        the same order (NaN and NaT for symbols without prices)
+        """
+        closes = np.full(len(symbols), np.nan)
+        dates = np.full(len(symbols), np.datetime64('NaT'), dtype='datetime64[D]')
+        for index, symbol in enumerate(symbols):
+            if symbol in self:
+                series = self.series(symbol)
+                if len(series):
+                    closes[index] = series.ohlcv[CLOSE, -1]
+                    dates[index] = series.dates[-1]
+        return closes, dates
+
+    def write(self, prices):
+        """
+        Merge new rows into the store. prices maps symbol -> (dates, ohlcv) with
+        dates a datetime64[D] array and ohlcv a (5, n) array in COLUMNS order.
+        A row for a date that is already stored replaces the stored row, and
+        of several new rows for one date the last one is kept.
+        Returns the new store version.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest = json.loads(json.dumps(self.manifest))
+        version = time.time_ns()
+        superseded = []
+
+        for symbol, (dates, ohlcv) in prices.items():
+            symbol = normalize_symbol(symbol)
+            dates = np.asarray(dates, dtype='datetime64[D]')
+            ohlcv = np.asarray(ohlcv, dtype=float).reshape(len(COLUMNS), dates.size)
+            # Reversed, so the last of several new rows for a date wins
+            dates, ohlcv = dates[::-1], ohlcv[:, ::-1]
+            old = manifest['symbols'].get(symbol)
+            if old:
+                # New rows first, so np.unique keeps them over the stored ones
+                stored = self.series(symbol)
+                dates = np.concatenate((dates, stored.dates))
+                ohlcv = np.concatenate((ohlcv, stored.ohlcv), axis=1)
+                superseded += [old['dates'], old['ohlcv']]
+            # Sorted, one row per date; return_index picks the first occurrence
+            dates, index = np.unique(dates, return_index=True)
+            ohlcv = np.ascontiguousarray(ohlcv[:, index])
+
+            entry = {
+                'dates': f'{symbol}-{version}.dates.npy',
+                'ohlcv': f'{symbol}-{version}.ohlcv.npy',
+                'rows': int(dates.size),
+                'first': str(dates[0]) if dates.size else None,
+                'last': str(dates[-1]) if dates.size else None,
+            }
+            np.save(self.root / entry['dates'], dates)
+            np.save(self.root / entry['ohlcv'], ohlcv)
+            manifest['symbols'][symbol] = entry
+
+        manifest['version'] = version
+        temporary = self.root / f'{MANIFEST}.{os.getpid()}.tmp'
+        temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(temporary, self.root / MANIFEST)
+
+        for name in superseded:
+            self._maps.pop(name, None)
+            try:
+                os.remove(self.root / name)
+            except OSError:
+                # Still mapped by a reader on a platform that forbids removal
+                pass
+        return version
+
+
+# Shared by the request path; each process keeps its own memory maps
+price_store = PriceStore()
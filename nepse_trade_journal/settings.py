@@ -48,9 +48,12 @@ INSTALLED_APPS = [
     'journal',
     'portfolio',
     'learning',
+    'market',
 ]
 
 MIDDLEWARE = [
+    # First, so it times the whole stack; inactive unless REQUEST_PROFILING is set
+    'core.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -92,6 +95,74 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# File-based so that every worker process and management command shares the
+# same per-user dashboard cache and invalidation tokens.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
+# Request profiling
+# Records wall time, query count, SQL time and the slowest statements of each
+# request for the admin performance page. Requests slower than
+# SLOW_REQUEST_THRESHOLD_MS are logged as JSON lines to the 'core.slow_requests'
+# logger, written to SLOW_REQUEST_LOG when set, otherwise to the console.
+
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))
+SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler' if SLOW_REQUEST_LOG else 'logging.StreamHandler',
+            'formatter': 'json_line',
+            **({'filename': SLOW_REQUEST_LOG} if SLOW_REQUEST_LOG else {}),
+        },
+    },
+    'loggers': {
+        'core.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Notification emails
+# Sent by the run_jobs worker in batches of NOTIFICATION_BATCH_SIZE over one SMTP
+# connection each, at most NOTIFICATION_RATE_LIMIT emails per second (0 for no
+# limit). A failed batch is retried NOTIFICATION_MAX_RETRIES times.
+
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@nepsejournal.com')
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+NOTIFICATION_RATE_LIMIT = float(os.environ.get('NOTIFICATION_RATE_LIMIT', 10))
+NOTIFICATION_MAX_RETRIES = int(os.environ.get('NOTIFICATION_MAX_RETRIES', 3))
+
+
+# Market prices
+# End-of-day OHLCV history per NEPSE symbol, stored as memory-mapped NumPy
+# files and filled by the load_prices command.
+
+PRICE_STORE_ROOT = os.environ.get('PRICE_STORE_ROOT', BASE_DIR / 'market_data')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -134,6 +205,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Private files, such as generated admin reports; never served from a URL,
+# only through views that check permissions
+PRIVATE_MEDIA_ROOT = os.environ.get('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
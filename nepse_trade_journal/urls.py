@@ -4,8 +4,9 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # core's admin/... pages must come before the Django admin's catch-all
     path('', include('core.urls')),
+    path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('journal/', include(('journal.urls', 'journal'), namespace='journal')),
     path('portfolio/', include(('portfolio.urls', 'portfolio'), namespace='portfolio')),
@@ -1,3 +1,24 @@
 from django.contrib import admin
+from .batching import defer_balance_updates, recompute_portfolios
+from .models import Portfolio, Transaction
 
-# Register your models here.
+@admin.register(Portfolio)
+class PortfolioAdmin(admin.ModelAdmin):
+    list_display = ('user', 'name', 'initial_capital', 'current_balance')
+    search_fields = ('user__username',)
+    readonly_fields = ('current_balance',)
+    actions = ['recalculate_selected']
+
+    @admin.action(description='Recalculate balance of selected portfolios')
+    def recalculate_selected(self, request, queryset):
+        recompute_portfolios(portfolio_ids=list(queryset.values_list('pk', flat=True)))
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+    list_display = ('portfolio', 'transaction_type', 'amount', 'date')
+    list_filter = ('transaction_type',)
+
+    def delete_queryset(self, request, queryset):
+        # Recompute each affected portfolio once instead of once per transaction
+        with defer_balance_updates():
+            super().delete_queryset(request, queryset)
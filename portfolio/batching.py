@@ -0,0 +1,75 @@
+"""
+Coalesce balance maintenance for bulk writes.
+
+Saving many trades or transactions one by one normally applies a balance
+delta (and a snapshot update) per row. Inside ``defer_balance_updates()``
+those per-row signals only record which portfolios were touched; each of
+them is then recomputed once, after the surrounding transaction commits.
+
+    with defer_balance_updates():
+        for trade in trades:
+            trade.save()
+
+It also works as a decorator, and bulk_create()/bulk_update() callers can
+mark the affected users themselves with ``mark_user_dirty()``.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+_state = threading.local()
+
+
+def is_deferred():
+    """Return True while inside a defer_balance_updates() block"""
+    return getattr(_state, 'batch', None) is not None
+
+
+def mark_user_dirty(user_id):
+    """Schedule the portfolio of user_id for recomputation at the end of the batch"""
+    _state.batch['users'].add(user_id)
+
+
+def mark_portfolio_dirty(portfolio_id):
+    """Schedule portfolio_id for recomputation at the end of the batch"""
+    _state.batch['portfolios'].add(portfolio_id)
+
+
+def recompute_portfolios(user_ids=(), portfolio_ids=()):
+    """Recompute the balance and daily snapshots of the given portfolios"""
+    from django.db.models import Q
+    from portfolio.models import Portfolio, reconcile_balances, rebuild_snapshots
+
+    from portfolio.signals import ledger_changed
+
+    portfolios = Portfolio.objects.filter(Q(user_id__in=user_ids) | Q(pk__in=portfolio_ids))
+    with transaction.atomic():
+        reconcile_balances(portfolios)
+        for portfolio in portfolios.iterator():
+            rebuild_snapshots(portfolio)
+    ledger_changed.send(sender=Portfolio, user_ids=set(user_ids) | set(
+        portfolios.values_list('user_id', flat=True)
+    ))
+
+
+@contextmanager
+def defer_balance_updates(using=None):
+    """Suppress per-row balance signals and recompute dirty portfolios once on commit"""
+    if is_deferred():
+        # Nested blocks join the outermost batch
+        yield
+        return
+
+    _state.batch = {'users': set(), 'portfolios': set()}
+    try:
+        yield
+    finally:
+        batch = _state.batch
+        _state.batch = None
+        if batch['users'] or batch['portfolios']:
+            # Runs immediately in autocommit mode; dropped with the rows on rollback
+            transaction.on_commit(
+                lambda: recompute_portfolios(batch['users'], batch['portfolios']),
+                using=using,
+            )
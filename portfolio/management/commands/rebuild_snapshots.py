@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from portfolio.models import Portfolio, rebuild_snapshots
+
+class Command(BaseCommand):
+    help = 'Backfill the daily equity snapshots of every portfolio from its full ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the portfolio of this username')
+
+    def handle(self, *args, **options):
+        portfolios = Portfolio.objects.select_related('user')
+        if options['user']:
+            portfolios = portfolios.filter(user__username=options['user'])
+        
+        self.stdout.write(self.style.WARNING(f'Rebuilding snapshots for {portfolios.count()} portfolios...'))
+        
+        count = 0
+        for portfolio in portfolios.iterator():
+            with transaction.atomic():
+                days = rebuild_snapshots(portfolio)
+            self.stdout.write(f'{portfolio.user.username}: {days} days')
+            count += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt snapshots for {count} portfolios'))
@@ -1,25 +1,56 @@
 from django.core.management.base import BaseCommand
-from portfolio.models import Portfolio
+from django.db import transaction
+from core.parallel import map_chunks, pk_chunks
+from portfolio.models import Portfolio, reconcile_balances
+
+
+def reconcile_range(first_pk, last_pk, dry_run=False, unchanged=False):
+    """Reconcile the portfolios whose pk lies in [first_pk, last_pk]"""
+    with transaction.atomic():
+        return reconcile_balances(
+            Portfolio.objects.filter(pk__gte=first_pk, pk__lte=last_pk), dry_run=dry_run, unchanged=unchanged
+        )
+
 
 class Command(BaseCommand):
     help = 'Recalculate all portfolio balances'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without saving them')
+        parser.add_argument('--diff-only', action='store_true', help='Only list portfolios whose balance is wrong')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Portfolios reconciled per query (default: 1000)')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
+
     def handle(self, *args, **options):
-        portfolios = Portfolio.objects.all()
-        count = 0
+        chunks = pk_chunks(Portfolio.objects.all(), options['chunk_size'])
+        total = sum(chunk.size for chunk in chunks)
         
-        self.stdout.write(self.style.WARNING(f'Recalculating {portfolios.count()} portfolios...'))
-        
-        for portfolio in portfolios:
-            old_balance = portfolio.current_balance
-            new_balance = portfolio.calculate_balance()
-            
-            if old_balance != new_balance:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Updated {portfolio.user.username}: Rs.{old_balance} -> Rs.{new_balance}'
+        self.stdout.write(self.style.WARNING(f'Recalculating {total} portfolios...'))
+
+        def on_progress(done, total):
+            self.stdout.write(f'Progress: {done}/{total}')
+
+        count = 0
+        updated = 0
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        show_progress = not options['diff_only'] and options['verbosity'] > 0
+        for checked, rows in map_chunks(
+            reconcile_range, chunks, options['dry_run'], not options['diff_only'],
+            workers=options['workers'], on_progress=on_progress if show_progress else None,
+        ):
+            count += checked
+            for username, old_balance, new_balance in rows:
+                if old_balance != new_balance:
+                    updated += 1
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'{verb} {username}: Rs.{old_balance} -> Rs.{new_balance}'
+                        )
                     )
-                )
-            count += 1
+                else:
+                    self.stdout.write(f'Unchanged {username}: Rs.{old_balance}')
         
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {count} portfolios'))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Checked {count} portfolios, {updated} would change (dry run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Successfully updated {count} portfolios ({updated} changed)'))
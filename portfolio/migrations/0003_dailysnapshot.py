@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_portfolio_current_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('deposits', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('withdrawals', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('realized_pnl', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('deposit_count', models.IntegerField(default=0)),
+                ('withdrawal_count', models.IntegerField(default=0)),
+                ('trade_count', models.IntegerField(default=0)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_snapshots', to='portfolio.portfolio')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('portfolio', 'date')},
+            },
+        ),
+    ]
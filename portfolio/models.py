@@ -1,7 +1,13 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Sum, Count, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDate
 from django.conf import settings
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+from .batching import is_deferred, mark_user_dirty, mark_portfolio_dirty
+from .signals import ledger_changed
 
 class Portfolio(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='portfolio')
@@ -13,27 +19,30 @@ class Portfolio(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Portfolio"
 
+    def save(self, *args, **kwargs):
+        # The balance is maintained with atomic delta updates, so a plain save
+        # of an existing portfolio must not write back a possibly stale value.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'current_balance'
+            ]
+        super().save(*args, **kwargs)
+
     def calculate_balance(self):
-        """Calculate and update current balance"""
-        # Start with initial capital
-        balance = self.initial_capital
-        
-        # Add deposits and subtract withdrawals
-        transactions = self.transactions.all()
-        for t in transactions:
-            if t.transaction_type == 'DEPOSIT':
-                balance += t.amount
-            elif t.transaction_type == 'WITHDRAWAL':
-                balance -= t.amount
-                
-        # Add realized PnL from closed trades
-        trades = self.user.trades.filter(status='CLOSED')
-        for trade in trades:
-            if trade.pnl:
-                balance += trade.pnl
-                
+        """
+        Recompute the balance from the full ledger.
+
+        Day-to-day changes are applied as deltas by the signals below; this
+        full rescan is only needed to repair a balance that has drifted.
+        """
+        balance = round(annotate_ledger_balance(Portfolio.objects.filter(pk=self.pk)).values_list(
+            'ledger_balance', flat=True
+        ).get(), 2)
         self.current_balance = balance
-        self.save()
+        # Write only the balance so concurrent delta updates are not clobbered
+        # by stale values of the other fields.
+        Portfolio.objects.filter(pk=self.pk).update(current_balance=balance)
         return balance
 
 class Transaction(models.Model):
@@ -48,37 +57,313 @@ class Transaction(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=200, blank=True)
 
+    class Meta:
+        indexes = [
+            # Ledger sums per type and the daily snapshot rollup
+            models.Index(fields=['portfolio', 'transaction_type', 'date'], name='txn_portfolio_type_date_idx'),
+            # Recent transactions on the portfolio page
+            models.Index(fields=['portfolio', 'date'], name='txn_portfolio_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.amount}"
 
-# Signals to automatically update portfolio balance
+    @property
+    def signed_amount(self):
+        """Effect of this transaction on the portfolio balance"""
+        if self.transaction_type == 'DEPOSIT':
+            return self.amount
+        elif self.transaction_type == 'WITHDRAWAL':
+            return -self.amount
+        return Decimal('0.00')
+
+class DailySnapshot(models.Model):
+    """Per-day cash flow and realized P&L of a portfolio, kept up to date by signals"""
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='daily_snapshots')
+    date = models.DateField()
+    deposits = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    withdrawals = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    realized_pnl = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    deposit_count = models.IntegerField(default=0)
+    withdrawal_count = models.IntegerField(default=0)
+    trade_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('portfolio', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.portfolio} - {self.date}"
+
+    @property
+    def net_change(self):
+        return self.deposits - self.withdrawals + self.realized_pnl
+
+
+def transaction_entry(transaction):
+    """Return the (date, snapshot amounts) a transaction contributes"""
+    if transaction.transaction_type == 'DEPOSIT':
+        amounts = {'deposits': transaction.amount, 'deposit_count': 1}
+    elif transaction.transaction_type == 'WITHDRAWAL':
+        amounts = {'withdrawals': transaction.amount, 'withdrawal_count': 1}
+    else:
+        return None
+    return timezone.localdate(transaction.date), amounts
+
+def trade_entry(trade):
+    """Return the (date, snapshot amounts) a closed trade contributes"""
+    pnl = trade.realized_pnl
+    # Backtest trades are simulated and never touch the real ledger
+    if pnl is None or trade.is_backtest:
+        return None
+    closed_on = trade.exit_date or trade.entry_date
+    return timezone.localdate(closed_on), {'realized_pnl': pnl, 'trade_count': 1}
+
+def record_snapshot(portfolio_id, entry, sign=1):
+    """Add (sign=1) or remove (sign=-1) a ledger entry from its daily snapshot"""
+    if portfolio_id is None or entry is None:
+        return
+    date, amounts = entry
+    if sign > 0:
+        DailySnapshot.objects.get_or_create(portfolio_id=portfolio_id, date=date)
+    # Removals only touch existing rows, so cascading deletes of a portfolio's
+    # trades never recreate snapshots for a portfolio that is going away.
+    DailySnapshot.objects.filter(portfolio_id=portfolio_id, date=date).update(
+        **{field: F(field) + sign * value for field, value in amounts.items()}
+    )
+
+def rebuild_snapshots(portfolio):
+    """Recompute every daily snapshot of a portfolio from the full ledger"""
+    days = {}
+
+    def row_for(date):
+        if date not in days:
+            days[date] = DailySnapshot(
+                portfolio=portfolio, date=date, deposits=Decimal('0.00'),
+                withdrawals=Decimal('0.00'), realized_pnl=Decimal('0.00'),
+            )
+        return days[date]
+
+    transactions = portfolio.transactions.annotate(day=TruncDate('date')).values(
+        'day', 'transaction_type'
+    ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+    for group in transactions:
+        row = row_for(group['day'])
+        if group['transaction_type'] == 'DEPOSIT':
+            row.deposits += group['total']
+            row.deposit_count += group['count']
+        elif group['transaction_type'] == 'WITHDRAWAL':
+            row.withdrawals += group['total']
+            row.withdrawal_count += group['count']
+
+    trades = Trade.objects.filter(
+        user_id=portfolio.user_id, status='CLOSED', realized_pnl__isnull=False, is_backtest=False
+    ).annotate(
+        day=TruncDate(Coalesce('exit_date', 'entry_date'))
+    ).values('day').annotate(total=Sum('realized_pnl'), count=Count('id')).order_by()
+    for group in trades:
+        row = row_for(group['day'])
+        row.realized_pnl += group['total']
+        row.trade_count += group['count']
+
+    DailySnapshot.objects.filter(portfolio=portfolio).delete()
+    DailySnapshot.objects.bulk_create(days.values(), batch_size=500)
+    return len(days)
+
+
+def annotate_ledger_balance(queryset):
+    """
+    Annotate portfolios with ``ledger_balance``: initial capital plus
+    deposits, minus withdrawals, plus realized P&L, all summed by the database.
+    """
+    amount = DecimalField(max_digits=15, decimal_places=2)
+    zero = Value(Decimal('0.00'), output_field=amount)
+
+    def ledger_sum(rows, group_by, field):
+        totals = rows.order_by().values(group_by).annotate(total=Sum(field)).values('total')
+        return Coalesce(Subquery(totals, output_field=amount), zero)
+
+    transactions = Transaction.objects.filter(portfolio=OuterRef('pk'))
+    closed_trades = Trade.objects.filter(user=OuterRef('user'), status='CLOSED', is_backtest=False)
+    return queryset.annotate(
+        ledger_balance=F('initial_capital')
+        + ledger_sum(transactions.filter(transaction_type='DEPOSIT'), 'portfolio', 'amount')
+        - ledger_sum(transactions.filter(transaction_type='WITHDRAWAL'), 'portfolio', 'amount')
+        + ledger_sum(closed_trades, 'user', 'realized_pnl')
+    )
+
+
+def reconcile_balances(queryset, dry_run=False, unchanged=False):
+    """
+    Recompute the balances of the given portfolios with one grouped query and
+    bulk update the ones that drifted. Returns the number of portfolios
+    checked and a list of (username, old balance, new balance) changes; with
+    unchanged it also lists the portfolios whose balance was already right.
+    """
+    rows = annotate_ledger_balance(queryset).values_list(
+        'pk', 'user_id', 'user__username', 'current_balance', 'ledger_balance'
+    )
+
+    checked = 0
+    changed = []
+    diffs = []
+    for pk, user_id, username, old_balance, new_balance in rows:
+        checked += 1
+        new_balance = round(new_balance, 2)
+        if old_balance != new_balance:
+            changed.append(Portfolio(pk=pk, user_id=user_id, current_balance=new_balance))
+            diffs.append((username, old_balance, new_balance))
+        elif unchanged:
+            diffs.append((username, old_balance, new_balance))
+
+    if changed and not dry_run:
+        Portfolio.objects.bulk_update(changed, ['current_balance'], batch_size=500)
+        ledger_changed.send(sender=Portfolio, user_ids={portfolio.user_id for portfolio in changed})
+    return checked, diffs
+
+
+def shift_balance(delta, **filters):
+    """Atomically add delta to the current balance of the matching portfolio"""
+    if delta:
+        Portfolio.objects.filter(**filters).update(current_balance=F('current_balance') + delta)
+
+
+# Signals to keep the portfolio balance up to date. Each signal applies only
+# the change in the saved row's contribution instead of rescanning the ledger.
+# Inside defer_balance_updates() they just mark the portfolio as dirty.
+@receiver(post_save, sender=Portfolio)
+def initialize_balance_on_portfolio_create(sender, instance, created, raw, **kwargs):
+    """Seed a new portfolio's balance from any trades logged before it existed"""
+    if created and not raw:
+        instance.calculate_balance()
+        rebuild_snapshots(instance)
+
+@receiver(pre_save, sender=Portfolio)
+def remember_initial_capital(sender, instance, raw, **kwargs):
+    """Remember the stored initial capital so a change can be applied as a delta"""
+    previous = None
+    if not instance._state.adding and not raw:
+        previous = Portfolio.objects.filter(pk=instance.pk).values_list('initial_capital', flat=True).first()
+    instance._previous_initial_capital = previous
+
+@receiver(post_save, sender=Portfolio)
+def update_balance_on_capital_change(sender, instance, created, **kwargs):
+    """Move the balance by the change in initial capital"""
+    previous = getattr(instance, '_previous_initial_capital', None)
+    if not created and previous is not None:
+        delta = Decimal(str(instance.initial_capital)) - previous
+        shift_balance(delta, pk=instance.pk)
+        instance.current_balance = Decimal(str(instance.current_balance)) + delta
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_amount(sender, instance, raw, **kwargs):
+    """Remember the stored contribution of a transaction before it is changed"""
+    instance._previous_transaction = None
+    if instance._state.adding or raw:
+        return
+    if is_deferred():
+        # Only the portfolio matters here: a moved transaction dirties both
+        instance._previous_transaction = Transaction.objects.filter(pk=instance.pk).only('portfolio_id').first()
+        return
+    instance._previous_transaction = Transaction.objects.filter(pk=instance.pk).first()
+
 @receiver(post_save, sender=Transaction)
 def update_balance_on_transaction_save(sender, instance, created, **kwargs):
     """Update portfolio balance when a transaction is saved"""
-    instance.portfolio.calculate_balance()
+    old = getattr(instance, '_previous_transaction', None)
+    moved = old is not None and old.portfolio_id != instance.portfolio_id
+    if is_deferred():
+        mark_portfolio_dirty(instance.portfolio_id)
+        if moved:
+            mark_portfolio_dirty(old.portfolio_id)
+        return
+    if moved:
+        # Take the whole amount off the old portfolio and add it to the new one
+        shift_balance(-old.signed_amount, pk=old.portfolio_id)
+        shift_balance(instance.signed_amount, pk=instance.portfolio_id)
+        # The post_save cache invalidation only covers the new portfolio's owner
+        ledger_changed.send(sender=Transaction, user_ids=set(
+            Portfolio.objects.filter(pk=old.portfolio_id).values_list('user_id', flat=True)
+        ))
+    else:
+        previous = old.signed_amount if old is not None else Decimal('0.00')
+        shift_balance(instance.signed_amount - previous, pk=instance.portfolio_id)
+    if old is not None:
+        record_snapshot(old.portfolio_id, transaction_entry(old), sign=-1)
+    record_snapshot(instance.portfolio_id, transaction_entry(instance))
 
 @receiver(post_delete, sender=Transaction)
 def update_balance_on_transaction_delete(sender, instance, **kwargs):
     """Update portfolio balance when a transaction is deleted"""
-    instance.portfolio.calculate_balance()
+    if is_deferred():
+        mark_portfolio_dirty(instance.portfolio_id)
+        return
+    shift_balance(-instance.signed_amount, pk=instance.portfolio_id)
+    record_snapshot(instance.portfolio_id, transaction_entry(instance), sign=-1)
 
 # Import Trade model and add signal for it
 from journal.models import Trade
 
+@receiver(pre_save, sender=Trade)
+def remember_trade_pnl(sender, instance, raw, **kwargs):
+    """Remember the stored realized P&L and owner of a trade before it is changed"""
+    instance._previous_trade = None
+    if instance._state.adding or raw:
+        return
+    if is_deferred():
+        # Only the owner matters here: a trade moved to another user dirties both
+        instance._previous_trade = Trade.objects.filter(pk=instance.pk).only('user_id').first()
+        return
+    instance._previous_trade = Trade.objects.filter(pk=instance.pk).only(
+        'user_id', 'realized_pnl', 'entry_date', 'exit_date', 'is_backtest'
+    ).first()
+
+def _portfolio_id_for(user_id):
+    return Portfolio.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+
 @receiver(post_save, sender=Trade)
 def update_balance_on_trade_save(sender, instance, **kwargs):
-    """Update portfolio balance when a trade is closed"""
-    try:
-        portfolio = instance.user.portfolio
-        portfolio.calculate_balance()
-    except Portfolio.DoesNotExist:
-        pass
+    """Update portfolio balance when a trade is closed or moved to another user"""
+    old = getattr(instance, '_previous_trade', None)
+    moved = old is not None and old.user_id != instance.user_id
+    if is_deferred():
+        mark_user_dirty(instance.user_id)
+        if moved:
+            mark_user_dirty(old.user_id)
+        return
+    old_entry = trade_entry(old) if old is not None else None
+    new_entry = trade_entry(instance)
+    if moved:
+        # Take the old contribution off the previous owner's ledger and add
+        # the new one to the new owner's, as a delete followed by a create
+        old_portfolio_id = _portfolio_id_for(old.user_id)
+        if old_entry is not None:
+            shift_balance(-old_entry[1]['realized_pnl'], pk=old_portfolio_id)
+            record_snapshot(old_portfolio_id, old_entry, sign=-1)
+        # The post_save cache invalidation only covers the new owner
+        ledger_changed.send(sender=Trade, user_ids={old.user_id})
+        old_entry = None
+    if old_entry is None and new_entry is None:
+        return
+    portfolio_id = _portfolio_id_for(instance.user_id)
+    if portfolio_id is None:
+        return
+    previous = old_entry[1]['realized_pnl'] if old_entry else Decimal('0.00')
+    current = new_entry[1]['realized_pnl'] if new_entry else Decimal('0.00')
+    shift_balance(current - previous, pk=portfolio_id)
+    if old_entry != new_entry:
+        record_snapshot(portfolio_id, old_entry, sign=-1)
+        record_snapshot(portfolio_id, new_entry)
 
 @receiver(post_delete, sender=Trade)
 def update_balance_on_trade_delete(sender, instance, **kwargs):
     """Update portfolio balance when a trade is deleted"""
-    try:
-        portfolio = instance.user.portfolio
-        portfolio.calculate_balance()
-    except Portfolio.DoesNotExist:
-        pass
+    if is_deferred():
+        mark_user_dirty(instance.user_id)
+        return
+    entry = trade_entry(instance)
+    if entry is None:
+        return
+    portfolio_id = _portfolio_id_for(instance.user_id)
+    shift_balance(-entry[1]['realized_pnl'], pk=portfolio_id)
+    record_snapshot(portfolio_id, entry, sign=-1)
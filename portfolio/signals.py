@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with ``user_ids`` after balances or snapshots were changed in bulk,
+# bypassing the per-row model signals (batched writes, reconciliation).
+ledger_changed = Signal()
@@ -1,3 +1,151 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from journal.models import Trade
+from .batching import defer_balance_updates
+from .models import DailySnapshot, Portfolio, Transaction, annotate_ledger_balance, rebuild_snapshots
+
+
+class BalanceSignalTests(TestCase):
+    """The delta updates applied by the signals must always match a full ledger rescan"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+        self.portfolio_a = Portfolio.objects.create(user=self.alice, initial_capital=Decimal('1000.00'))
+        self.portfolio_b = Portfolio.objects.create(user=self.bob, initial_capital=Decimal('500.00'))
+
+    def assertLedgerMatches(self):
+        for portfolio in annotate_ledger_balance(Portfolio.objects.all()):
+            self.assertEqual(portfolio.current_balance, round(portfolio.ledger_balance, 2), portfolio)
+            # The incrementally maintained snapshots must add up like rebuilt ones
+            snapshots = {
+                row.date: (row.deposits, row.withdrawals, row.realized_pnl)
+                for row in DailySnapshot.objects.filter(portfolio=portfolio)
+                if row.deposit_count or row.withdrawal_count or row.trade_count
+            }
+            rebuild_snapshots(portfolio)
+            rebuilt = {
+                row.date: (row.deposits, row.withdrawals, row.realized_pnl)
+                for row in DailySnapshot.objects.filter(portfolio=portfolio)
+            }
+            self.assertEqual(snapshots, rebuilt, portfolio)
+
+    def balance(self, portfolio):
+        portfolio.refresh_from_db()
+        return portfolio.current_balance
+
+    def closed_trade(self, user, pnl_per_share, **fields):
+        return Trade.objects.create(
+            user=user, symbol='NABIL', trade_type='BUY', quantity=10,
+            entry_price=Decimal('500.00'), exit_price=Decimal('500.00') + pnl_per_share,
+            entry_date=timezone.now() - timedelta(days=3), exit_date=timezone.now(),
+            status='CLOSED', **fields,
+        )
+
+    def test_transaction_create_edit_and_delete(self):
+        deposit = Transaction.objects.create(portfolio=self.portfolio_a, transaction_type='DEPOSIT', amount=Decimal('200.00'))
+        Transaction.objects.create(portfolio=self.portfolio_a, transaction_type='WITHDRAWAL', amount=Decimal('50.00'))
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1150.00'))
+        self.assertLedgerMatches()
+
+        deposit.amount = Decimal('300.00')
+        deposit.save()
+        self.assertLedgerMatches()
+        deposit.transaction_type = 'WITHDRAWAL'
+        deposit.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('650.00'))
+        self.assertLedgerMatches()
+
+        deposit.delete()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('950.00'))
+        self.assertLedgerMatches()
+
+    def test_transaction_moved_to_another_portfolio(self):
+        deposit = Transaction.objects.create(portfolio=self.portfolio_a, transaction_type='DEPOSIT', amount=Decimal('200.00'))
+        deposit.portfolio = self.portfolio_b
+        deposit.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+        self.assertEqual(self.balance(self.portfolio_b), Decimal('700.00'))
+        self.assertLedgerMatches()
+
+        # Moved and changed in the same save
+        deposit.portfolio = self.portfolio_a
+        deposit.amount = Decimal('120.00')
+        deposit.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1120.00'))
+        self.assertEqual(self.balance(self.portfolio_b), Decimal('500.00'))
+        self.assertLedgerMatches()
+
+    def test_trade_open_close_edit_and_delete(self):
+        trade = Trade.objects.create(
+            user=self.alice, symbol='NABIL', trade_type='BUY', quantity=10, entry_price=Decimal('500.00')
+        )
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+
+        trade.status = 'CLOSED'
+        trade.exit_price = Decimal('520.00')
+        trade.exit_date = timezone.now()
+        trade.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1200.00'))
+        self.assertLedgerMatches()
+
+        trade.exit_price = Decimal('490.00')
+        trade.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('900.00'))
+        self.assertLedgerMatches()
+
+        trade.status = 'OPEN'
+        trade.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+        self.assertLedgerMatches()
+
+        trade.status = 'CLOSED'
+        trade.save()
+        trade.delete()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+        self.assertLedgerMatches()
+
+    def test_trade_moved_to_another_user(self):
+        trade = self.closed_trade(self.alice, Decimal('30.00'))
+        trade.user = self.bob
+        trade.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+        self.assertEqual(self.balance(self.portfolio_b), Decimal('800.00'))
+        self.assertLedgerMatches()
+
+    def test_backtest_trades_do_not_touch_the_ledger(self):
+        trade = self.closed_trade(self.alice, Decimal('30.00'), is_backtest=True)
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1000.00'))
+        self.assertLedgerMatches()
+
+        trade.is_backtest = False
+        trade.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('1300.00'))
+        self.assertLedgerMatches()
+
+    def test_initial_capital_change(self):
+        self.closed_trade(self.alice, Decimal('10.00'))
+        self.portfolio_a.initial_capital = Decimal('2000.00')
+        self.portfolio_a.save()
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('2100.00'))
+        self.assertLedgerMatches()
 
-# Create your tests here.
+    def test_deferred_updates_recompute_both_sides_of_a_move(self):
+        deposit = Transaction.objects.create(portfolio=self.portfolio_a, transaction_type='DEPOSIT', amount=Decimal('200.00'))
+        trade = self.closed_trade(self.alice, Decimal('30.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            with defer_balance_updates():
+                deposit.portfolio = self.portfolio_b
+                deposit.save()
+                trade.user = self.bob
+                trade.save()
+                self.closed_trade(self.alice, Decimal('-5.00'))
+        self.assertEqual(self.balance(self.portfolio_a), Decimal('950.00'))
+        self.assertEqual(self.balance(self.portfolio_b), Decimal('1000.00'))
+        self.assertLedgerMatches()
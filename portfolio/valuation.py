@@ -0,0 +1,93 @@
+"""
+Mark-to-market valuation of a user's open trades.
+
+All open live trades are loaded in one query as column arrays and priced in
+a single vectorised step against the latest close of every symbol in the
+local price store (market.store). Results are cached per user until their
+trades change or new prices are loaded.
+"""
+import numpy as np
+
+from core.cache import cached_for_user
+from journal.models import Trade
+from market.store import price_store
+
+
+def open_position_arrays(user):
+    """Load the symbol, direction, quantity and entry price of a user's open live trades"""
+    rows = list(Trade.objects.filter(user=user, status='OPEN', is_backtest=False).values_list(
+        'symbol', 'trade_type', 'quantity', 'entry_price'
+    ))
+    if not rows:
+        return np.array([], dtype=str), np.array([], dtype=float), np.array([], dtype=float), np.array([], dtype=float)
+    symbols, trade_types, quantities, entry_prices = zip(*rows)
+    return (
+        np.array([symbol.strip().upper() for symbol in symbols]),
+        # +1 for long (BUY) positions, -1 for short (SELL) ones
+        np.where(np.array(trade_types) == 'SELL', -1.0, 1.0),
+        np.array(quantities, dtype=float),
+        np.array(entry_prices, dtype=float),
+    )
+
+
+def value_positions(symbols, sides, quantities, entry_prices, store=None):
+    """
+    Price open trades against the latest stored closes.
+
+    Returns a dict with a row per symbol (net quantity, cost, market value,
+    unrealized P&L, exposure as a share of the gross market value, and the
+    close used) plus portfolio totals. Trades in symbols without stored
+    prices are listed under 'unpriced' and left out of the totals.
+    """
+    store = store or price_store
+    unique_symbols, index = np.unique(symbols, return_inverse=True)
+    closes, close_dates = store.latest_closes(unique_symbols.tolist())
+
+    # Per trade, then summed per symbol with bincount
+    trade_close = closes[index]
+    priced = ~np.isnan(trade_close)
+    signed_quantity = sides * quantities
+    cost = signed_quantity * entry_prices
+    market_value = np.where(priced, signed_quantity * trade_close, 0.0)
+    unrealized = np.where(priced, market_value - cost, 0.0)
+
+    count = unique_symbols.size
+    net_quantity = np.bincount(index, weights=signed_quantity, minlength=count)
+    symbol_cost = np.bincount(index, weights=cost, minlength=count)
+    symbol_value = np.bincount(index, weights=market_value, minlength=count)
+    symbol_pnl = np.bincount(index, weights=unrealized, minlength=count)
+    trade_counts = np.bincount(index, minlength=count)
+    gross_value = np.abs(symbol_value).sum()
+
+    positions = []
+    for position in np.argsort(-np.abs(symbol_value), kind='stable'):
+        if np.isnan(closes[position]):
+            continue
+        positions.append({
+            'symbol': str(unique_symbols[position]),
+            'trades': int(trade_counts[position]),
+            'quantity': int(net_quantity[position]),
+            'cost': round(float(symbol_cost[position]), 2),
+            'close': float(closes[position]),
+            'close_date': str(close_dates[position]),
+            'market_value': round(float(symbol_value[position]), 2),
+            'unrealized_pnl': round(float(symbol_pnl[position]), 2),
+            'exposure': round(float(abs(symbol_value[position]) / gross_value * 100), 1) if gross_value else 0.0,
+        })
+
+    return {
+        'positions': positions,
+        'unpriced': [str(symbol) for symbol, close in zip(unique_symbols, closes) if np.isnan(close)],
+        'market_value': round(float(market_value.sum()), 2),
+        'gross_exposure': round(float(gross_value), 2),
+        'cost': round(float(cost[priced].sum()), 2),
+        'unrealized_pnl': round(float(unrealized.sum()), 2),
+        'price_version': store.version,
+    }
+
+
+def value_open_trades(user):
+    """The valuation of a user's open trades, cached until they change or prices are reloaded"""
+    return cached_for_user(
+        user.pk, f'valuation:{price_store.version}', lambda: value_positions(*open_position_arrays(user))
+    )
@@ -4,7 +4,8 @@ from django.contrib import messages
 from django.db.models import Sum, Q
 from .models import Portfolio, Transaction
 from .forms import PortfolioForm, TransactionForm
-from datetime import datetime, timedelta
+from .valuation import value_open_trades
+from journal.analytics import analyze_trades
 import json
 
 @login_required
@@ -15,75 +16,45 @@ def portfolio_dashboard(request):
         # Auto-create portfolio if it doesn't exist
         portfolio = Portfolio.objects.create(user=request.user)
     
-    # Get all transactions
-    all_transactions = portfolio.transactions.order_by('date')
-    recent_transactions = all_transactions.order_by('-date')[:10]
+    recent_transactions = portfolio.transactions.order_by('-date')[:10]
     
-    # Calculate deposits and withdrawals
-    deposits = all_transactions.filter(transaction_type='DEPOSIT')
-    withdrawals = all_transactions.filter(transaction_type='WITHDRAWAL')
+    # Totals and the balance history come from the precomputed daily snapshots
+    snapshots = portfolio.daily_snapshots.exclude(
+        deposit_count=0, withdrawal_count=0, trade_count=0
+    ).order_by('date')
+    totals = snapshots.aggregate(
+        total_deposits=Sum('deposits'),
+        total_withdrawals=Sum('withdrawals'),
+        deposit_count=Sum('deposit_count'),
+        withdrawal_count=Sum('withdrawal_count'),
+    )
+    total_deposits = totals['total_deposits'] or 0
+    total_withdrawals = totals['total_withdrawals'] or 0
+    deposit_count = totals['deposit_count'] or 0
+    withdrawal_count = totals['withdrawal_count'] or 0
+    total_pnl = analyze_trades(request.user).total_pnl
     
-    total_deposits = deposits.aggregate(Sum('amount'))['amount__sum'] or 0
-    total_withdrawals = withdrawals.aggregate(Sum('amount'))['amount__sum'] or 0
-    deposit_count = deposits.count()
-    withdrawal_count = withdrawals.count()
+    # Open trades marked to the latest local closing prices
+    valuation = value_open_trades(request.user)
+    equity = float(portfolio.current_balance) + valuation['unrealized_pnl']
     
     # Calculate balance history for chart
     balance_history = []
     balance_labels = []
     running_balance = float(portfolio.initial_capital)
     
-    # Group transactions by date
-    from collections import defaultdict
-    daily_transactions = defaultdict(list)
-    for txn in all_transactions:
-        date_str = txn.date.strftime('%Y-%m-%d')
-        daily_transactions[date_str].append(txn)
+    for date, deposits, withdrawals, realized_pnl in snapshots.values_list(
+        'date', 'deposits', 'withdrawals', 'realized_pnl'
+    ):
+        running_balance += float(deposits) - float(withdrawals) + float(realized_pnl)
+        balance_labels.append(date.strftime('%b %d'))
+        balance_history.append(round(running_balance, 2))
     
-    # Get trades for P&L calculation
-    closed_trades = request.user.trades.filter(status='CLOSED').order_by('exit_date')
-    
-    # Build balance history
-    all_dates = set()
-    for txn in all_transactions:
-        all_dates.add(txn.date.date())
-    for trade in closed_trades:
-        if trade.exit_date:
-            all_dates.add(trade.exit_date.date())
-    
-    all_dates = sorted(all_dates)
-    
-    if all_dates:
-        for date in all_dates:
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # Add transaction amounts
-            if date_str in daily_transactions:
-                for txn in daily_transactions[date_str]:
-                    if txn.transaction_type == 'DEPOSIT':
-                        running_balance += float(txn.amount)
-                    else:
-                        running_balance -= float(txn.amount)
-            
-            # Add trade P&L
-            for trade in closed_trades:
-                if trade.exit_date and trade.exit_date.date() == date:
-                    if trade.pnl:
-                        running_balance += float(trade.pnl)
-            
-            balance_labels.append(date.strftime('%b %d'))
-            balance_history.append(round(running_balance, 2))
-    else:
+    if not balance_history:
         # No transactions yet, just show initial capital
         balance_labels = ['Start']
         balance_history = [float(portfolio.initial_capital)]
     
-    # Calculate net profit/loss manually (since pnl is a property, not a field)
-    total_pnl = 0
-    for trade in closed_trades:
-        if trade.pnl:
-            total_pnl += float(trade.pnl)
-    
     net_change = float(portfolio.current_balance) - float(portfolio.initial_capital)
     
     # Calculate transaction balance after for each recent transaction
@@ -110,6 +81,8 @@ def portfolio_dashboard(request):
         'balance_labels': json.dumps(balance_labels),
         'balance_history': json.dumps(balance_history),
         'total_pnl': total_pnl,
+        'valuation': valuation,
+        'equity': equity,
         'net_change': net_change,
         'net_change_percent': (net_change / float(portfolio.initial_capital) * 100) if portfolio.initial_capital > 0 else 0,
     }
@@ -123,7 +96,7 @@ def update_portfolio(request):
         if form.is_valid():
             form.save()
             messages.success(request, 'Portfolio settings updated!')
-            return redirect('portfolio_dashboard')
+            return redirect('portfolio:portfolio_dashboard')
     else:
         form = PortfolioForm(instance=portfolio)
     return render(request, 'portfolio/portfolio_form.html', {'form': form})
@@ -138,7 +111,7 @@ def add_transaction(request):
             transaction.portfolio = portfolio
             transaction.save()
             messages.success(request, 'Transaction added successfully!')
-            return redirect('portfolio_dashboard')
+            return redirect('portfolio:portfolio_dashboard')
     else:
         form = TransactionForm()
     return render(request, 'portfolio/transaction_form.html', {'form': form})